@@ -0,0 +1,153 @@
+"""
+Caption engine benchmark: loading and per-tick lookup on synthetic long-form tracks.
+
+Loads SRT, WebVTT and YouTube auto-generated tracks through get_captions (cold and from
+the caption cache), get_captions_from_string and parse_srt_string, then replays
+find_caption / find_captions under three playback patterns:
+
+    sequential  100ms ticks from the start, like normal playback
+    random      random seeks over the whole track
+    backward    playback with a 5s jump back every 20 ticks (the "go back" key)
+
+Lookups are timed with the CaptionIndex and with the legacy linear scan (index=None),
+the latter only up to --legacy-max cues.  Every measurement is one JSON object per line
+(--json FILE, "-" for stdout) so runs can be diffed; a table goes to stderr.
+
+usage: python -m bench.caption_bench [--sizes 1000 10000 50000 200000] [--json results.jsonl]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from bench.synthetic import make_track_text
+from caption import get_captions, get_captions_from_string, parse_srt_string, find_caption, find_captions, \
+    CaptionIndex
+from caption.cache import CaptionCache, file_fingerprint
+
+FORMATS = ('srt', 'vtt', 'youtube')
+PATTERNS = ('sequential', 'random', 'backward')
+
+
+def best_of(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        cost = time.perf_counter() - t0
+        best = cost if best is None else min(best, cost)
+    return best, result
+
+
+def playback_times(pattern, length, queries, seed=0):
+    rnd = random.Random(seed)
+    if pattern == 'random':
+        return [rnd.randrange(0, length) for _ in range(queries)]
+    times = []
+    t = 0
+    for i in range(queries):
+        if pattern == 'backward' and i % 20 == 19:
+            t = max(0, t - 5000)
+        else:
+            t += 100
+        times.append(t % length)
+    return times
+
+
+def wait_complete(track):
+    """Big files are memory-mapped and indexed by a background thread, wait for it"""
+    while not getattr(track, 'complete', True):
+        time.sleep(0.01)
+    return track
+
+
+def replay(func, captions, times, index):
+    """Drive func like the player does, carrying cur_seq between ticks"""
+    cur_seq = set()
+    for t in times:
+        found = func(t, captions, cur_seq, index=index)
+        if isinstance(found, tuple):
+            found = found[0]
+        if found is not None:
+            cur_seq = {found['seq']}
+
+
+def run(sizes, queries=20000, repeat=3, legacy_max=50000):
+    results = []
+    for fmt in FORMATS:
+        for n in sizes:
+            content = make_track_text(n, fmt)
+            ext = 'srt' if fmt == 'srt' else 'vtt'
+            with tempfile.TemporaryDirectory() as d:
+                path = os.path.join(d, f'bench.{ext}')
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                cache = CaptionCache(os.path.join(d, 'cache'))
+                loads = [
+                    ('get_captions', 'cold', lambda: get_captions(path, cache=None)[0]),
+                    ('get_captions', 'cached', lambda: get_captions(path, cache=cache)[0]),
+                    ('get_captions_from_string', 'native', lambda: get_captions_from_string(content, ext)),
+                ]
+                if fmt == 'srt':
+                    loads.append(('parse_srt_string', 'native', lambda: parse_srt_string(content)))
+                # the track the lookups run on, also fills the cache for the cached loads
+                captions = wait_complete(get_captions(path, cache=None)[0])
+                cache.store(file_fingerprint(path), captions)
+                for bench, variant, func in loads:
+                    cost, track = best_of(func, repeat)
+                    results.append({'bench': bench, 'format': fmt, 'cues': len(track), 'pattern': 'load',
+                                    'variant': variant, 'ops': 1, 'seconds': cost, 'us_per_op': cost * 1e6})
+
+            cost, index = best_of(lambda: CaptionIndex(captions), repeat)
+            results.append({'bench': 'CaptionIndex', 'format': fmt, 'cues': len(captions), 'pattern': 'load',
+                            'variant': 'build', 'ops': 1, 'seconds': cost, 'us_per_op': cost * 1e6})
+            length = captions.ends[-1] + 1000 if len(captions) else 1000
+            for pattern in PATTERNS:
+                times = playback_times(pattern, length, queries)
+                for func in (find_caption, find_captions):
+                    variants = [('index', index)]
+                    if len(captions) <= legacy_max:
+                        variants.append(('linear', None))
+                    for variant, idx in variants:
+                        cost, _ = best_of(lambda: replay(func, captions, times, idx), repeat)
+                        results.append({'bench': func.__name__, 'format': fmt, 'cues': len(captions),
+                                        'pattern': pattern, 'variant': variant, 'ops': len(times),
+                                        'seconds': cost, 'us_per_op': cost / len(times) * 1e6})
+    return results
+
+
+def print_table(results, out=sys.stderr):
+    print(f"{'bench':<26} {'format':<8} {'cues':>8} {'pattern':<11} {'variant':<8} {'us/op':>12}", file=out)
+    for r in results:
+        print(f"{r['bench']:<26} {r['format']:<8} {r['cues']:>8} {r['pattern']:<11} {r['variant']:<8} "
+              f"{r['us_per_op']:>12.2f}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="caption engine benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000, 200000])
+    parser.add_argument('--queries', type=int, default=20000, help="lookups per access pattern")
+    parser.add_argument('--repeat', type=int, default=3, help="best of this many runs")
+    parser.add_argument('--legacy-max', type=int, default=50000, help="largest track for the linear scan")
+    parser.add_argument('--json', default='-', help="JSON lines output file, - for stdout")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.queries, args.repeat, args.legacy_max)
+    meta = {'python': platform.python_version(), 'machine': platform.machine(), 'time': int(time.time())}
+    out = sys.stdout if args.json == '-' else open(args.json, 'w', encoding='utf-8')
+    try:
+        for r in results:
+            out.write(json.dumps(dict(r, **meta)) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print_table(results)
+
+
+if __name__ == "__main__":
+    main()
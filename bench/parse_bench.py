@@ -0,0 +1,81 @@
+"""
+Compare the native SRT/WebVTT parser with the previous webvtt-py / pysrt path.
+
+usage: python -m bench.parse_bench [cue count ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pysrt
+import webvtt
+
+from caption import time_to_milliseconds, convert_srt_to_vtt
+from caption.parser import parse_subtitle_string, parse_subtitle_file
+from bench.synthetic import make_subtitle
+
+
+def legacy_srt_string(content):
+    """parse_srt_string before the native parser: pysrt -> webvtt.Caption -> time_to_milliseconds"""
+    captions = []
+    for i, sub in enumerate(pysrt.from_string(content)):
+        caption = webvtt.Caption(
+            start=f"{sub.start.hours:02d}:{sub.start.minutes:02d}:{sub.start.seconds:02d}.{sub.start.milliseconds:03d}",
+            end=f"{sub.end.hours:02d}:{sub.end.minutes:02d}:{sub.end.seconds:02d}.{sub.end.milliseconds:03d}",
+            text=sub.text
+        )
+        caption.start_in_milliseconds = time_to_milliseconds(caption.start)
+        caption.end_in_milliseconds = time_to_milliseconds(caption.end)
+        captions.append({'caption': caption, 'seq': i})
+    return captions
+
+
+def legacy_vtt_string(content):
+    captions = []
+    for i, caption in enumerate(webvtt.from_string(content)):
+        caption.start_in_milliseconds = time_to_milliseconds(caption.start)
+        caption.end_in_milliseconds = time_to_milliseconds(caption.end)
+        captions.append({'caption': caption, 'seq': i})
+    return captions
+
+
+def legacy_srt_file(srt_file):
+    """get_captions before the native parser: rewrite as .vtt next to the file, then webvtt.read"""
+    vtt_file = convert_srt_to_vtt(srt_file)
+    return [c.text for c in webvtt.read(vtt_file)]
+
+
+def timeit(func, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(*args)
+        cost = time.perf_counter() - t0
+        best = cost if best is None else min(best, cost)
+    return best
+
+
+def main(sizes):
+    print(f"{'cues':>8} {'case':<12} {'legacy ms':>10} {'native ms':>10} {'speedup':>8}")
+    for n in sizes:
+        srt = make_subtitle(n, 'srt')
+        vtt = make_subtitle(n, 'vtt')
+        with tempfile.TemporaryDirectory() as d:
+            srt_file = os.path.join(d, 'bench.srt')
+            with open(srt_file, 'w', encoding='utf-8') as f:
+                f.write(srt)
+            cases = [
+                ('srt string', legacy_srt_string, parse_subtitle_string, srt),
+                ('vtt string', legacy_vtt_string, parse_subtitle_string, vtt),
+                ('srt file', legacy_srt_file, parse_subtitle_file, srt_file),
+            ]
+            for name, legacy, native, arg in cases:
+                t_legacy = timeit(legacy, arg)
+                t_native = timeit(native, arg)
+                print(f"{n:>8} {name:<12} {t_legacy * 1000:>10.1f} {t_native * 1000:>10.1f} "
+                      f"{t_legacy / t_native:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [1000, 10000, 50000])
@@ -0,0 +1,66 @@
+"""
+Synthetic long-form caption tracks for the benchmarks.
+"""
+import random
+
+from caption.track import format_timestamp
+
+WORDS = "the quick brown fox jumps over a lazy dog while we watch this video and learn".split()
+
+
+def _stamp(ms, fmt):
+    stamp = format_timestamp(ms)
+    return stamp.replace('.', ',') if fmt == 'srt' else stamp
+
+
+def make_subtitle(n, fmt='srt', seed=0):
+    """n cues of SRT ('srt') or WebVTT ('vtt') with random gaps, lengths and a few overlaps"""
+    rnd = random.Random(seed)
+    out = ["WEBVTT\n"] if fmt == 'vtt' else []
+    t = 0
+    for i in range(n):
+        start = t + rnd.randint(0, 400)
+        end = start + rnd.randint(800, 4000)
+        # every 50th cue overlaps the next one (two speakers)
+        t = end if i % 50 else start + 200
+        text = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(3, 12)))
+        if rnd.random() < 0.2:
+            text += "\n" + " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 6)))
+        out.append(f"{i + 1}\n{_stamp(start, fmt)} --> {_stamp(end, fmt)}\n{text}\n")
+    return "\n".join(out) + "\n"
+
+
+def make_youtube(n, seed=0):
+    """
+    n spoken lines of a YouTube auto-generated WebVTT track: every line is a long cue
+    (previous line + the new one with <c> word timings) followed by a 10ms cue holding
+    only the finished line, so the file has 2n cues.
+    """
+    rnd = random.Random(seed)
+    out = ["WEBVTT\nKind: captions\nLanguage: en\n"]
+    t = 0
+    prev = " "
+    for _ in range(n):
+        words = [rnd.choice(WORDS) for _ in range(rnd.randint(4, 9))]
+        start = t
+        tagged = words[0]
+        w = start
+        for word in words[1:]:
+            w += rnd.randint(150, 450)
+            tagged += f"<{format_timestamp(w)}><c> {word}</c>"
+        end = w + rnd.randint(200, 600)
+        out.append(f"{format_timestamp(start)} --> {format_timestamp(end)} align:start position:0%\n"
+                   f"{prev}\n{tagged}\n")
+        line = " ".join(words)
+        out.append(f"{format_timestamp(end)} --> {format_timestamp(end + 10)} align:start position:0%\n"
+                   f"{line}\n \n")
+        prev = line
+        t = end + 10
+    return "\n".join(out) + "\n"
+
+
+def make_track_text(n, fmt, seed=0):
+    """'srt', 'vtt' or 'youtube' content with about n cues"""
+    if fmt == 'youtube':
+        return make_youtube(max(1, n // 2), seed)
+    return make_subtitle(n, fmt, seed)
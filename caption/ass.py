@@ -0,0 +1,133 @@
+import re
+
+from .parser import read_subtitle_file
+from .track import CaptionTrack
+
+# {\an8\pos(10,10)\c&H00FFFF&} style override blocks
+ASS_OVERRIDE = re.compile(r'\{[^}]*\}')
+# {\p1} .. {\p0} switches to vector drawing, those events are shapes, not text
+ASS_DRAWING = re.compile(r'\{[^}]*\\p[1-9]')
+ASS_NEWLINE = re.compile(r'\\[Nn]')
+ASS_TIME = re.compile(r'^\s*(\d+):(\d{1,2}):(\d{1,2})[.:](\d{1,3})\s*$')
+
+DEFAULT_FORMAT = ['layer', 'start', 'end', 'style', 'name', 'marginl', 'marginr', 'marginv', 'effect', 'text']
+
+
+def ass_time_to_ms(value):
+    """H:MM:SS.cc (centiseconds) to milliseconds"""
+    m = ASS_TIME.match(value)
+    if m is None:
+        raise ValueError(f"bad ASS time {value!r}")
+    h, mi, s, f = m.groups()
+    ms = int(f) * 10 ** (3 - len(f))
+    return ((int(h) * 60 + int(mi)) * 60 + int(s)) * 1000 + ms
+
+
+def ass_text(text):
+    """Dialogue text without override tags, \\N and \\n as line breaks, \\h as a space"""
+    if '{' in text:
+        text = ASS_OVERRIDE.sub('', text)
+    if '\\' in text:
+        text = ASS_NEWLINE.sub('\n', text).replace('\\h', ' ')
+    return '\n'.join(line.strip() for line in text.split('\n') if line.strip())
+
+
+class AssStreamParser:
+    """
+    One-pass ASS/SSA parser, fed whole files or chunks of an ffmpeg pipe.
+
+    Only the [Events] section matters: its Format line gives the field order and every
+    Dialogue line becomes a caption.  Text is the last field and may contain commas, so a
+    line is split at most len(format) - 1 times.  Drawing events and the copies typesetters
+    stack on several layers (same time, same text) are dropped.
+    Each feed() is sorted on its own, ffmpeg already writes the events of a track in time order.
+    """
+
+    def __init__(self, track=None):
+        if track is None:
+            track = CaptionTrack()
+        self.track = track
+        self.track.complete = False
+        self._buf = ''
+        self._in_events = False
+        self._set_format(DEFAULT_FORMAT)
+        self._last = None
+
+    def _set_format(self, fields):
+        self._field_count = len(fields)
+        self._start_i = fields.index('start')
+        self._end_i = fields.index('end')
+        self._text_i = fields.index('text')
+
+    def feed(self, text):
+        """Parse the complete lines of text, return how many captions were added"""
+        buf = self._buf + text
+        cut = buf.rfind('\n')
+        if cut == -1:
+            self._buf = buf
+            return 0
+        self._buf = buf[cut + 1:]
+        return self._parse_lines(buf[:cut].split('\n'))
+
+    def close(self):
+        if self._buf:
+            self._parse_lines([self._buf])
+            self._buf = ''
+        self.track.complete = True
+        return self.track
+
+    def _parse_lines(self, lines):
+        events = []
+        for line in lines:
+            if line.startswith('Dialogue:') and self._in_events:
+                event = self._parse_dialogue(line)
+                if event is not None:
+                    events.append(event)
+            elif line.startswith('['):
+                self._in_events = line.strip().lower() == '[events]'
+            elif line.startswith('Format:') and self._in_events:
+                fields = [f.strip().lower() for f in line[7:].split(',')]
+                if {'start', 'end', 'text'}.issubset(fields):
+                    self._set_format(fields)
+        if not events:
+            return 0
+        # the index wants start order, Dialogue lines may come in any order (style groups),
+        # sorting whole tuples also puts layered copies next to each other
+        events.sort()
+        starts, ends, texts = [], [], []
+        last = self._last
+        for event in events:
+            if event == last:
+                continue
+            last = event
+            starts.append(event[0])
+            ends.append(event[1])
+            texts.append(event[2])
+        self._last = last
+        self.track.extend(starts, ends, texts)
+        return len(starts)
+
+    def _parse_dialogue(self, line):
+        values = line[9:].rstrip('\r').split(',', self._field_count - 1)
+        if len(values) != self._field_count:
+            return None
+        raw = values[self._text_i]
+        if ASS_DRAWING.search(raw):
+            return None
+        text = ass_text(raw)
+        if not text:
+            return None
+        try:
+            return ass_time_to_ms(values[self._start_i]), ass_time_to_ms(values[self._end_i]), text
+        except ValueError:
+            return None
+
+
+def parse_ass_string(buf, track=None):
+    parser = AssStreamParser(track)
+    parser.feed(buf.replace('\r\n', '\n').replace('\r', '\n'))
+    return parser.close()
+
+
+def parse_ass_file(subtitle_file, track=None):
+    return parse_ass_string(read_subtitle_file(subtitle_file), track)
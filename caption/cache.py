@@ -0,0 +1,203 @@
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from .lazy import LAZY_LOAD_SIZE
+from .rollup import RollupCaptionTrack
+from .track import CaptionTrack, CaptionType
+
+CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'comprevids' / 'captions'
+# total size of the cache directory, least recently used entries are evicted past it
+CACHE_LIMIT = 256 * 1024 * 1024
+# sync files are a few bytes each, keep at most this many (least recently used go first)
+SYNC_LIMIT = 1000
+# bytes hashed at each of the three sample points of a big file
+SAMPLE_SIZE = 256 * 1024
+
+# magic, version, caption_type, count, text bytes
+HEADER = struct.Struct('<4sHHII')
+# offset ms, drift of the live subtitle sync
+SYNC = struct.Struct('<qd')
+MAGIC = b'CAPT'
+VERSION = 2
+# word count of a roll-up track, followed by its word_index and word_times
+WORDS = struct.Struct('<I')
+
+
+def file_fingerprint(path):
+    """
+    Cache key of a subtitle file: path, size, mtime and a hash of the content.
+    Files that are loaded lazily only hash a sample (head, middle, tail), hashing all of them
+    would make the time to first caption grow with the file again.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        if st.st_size > LAZY_LOAD_SIZE:
+            for pos in (0, st.st_size // 2, st.st_size - SAMPLE_SIZE):
+                f.seek(pos)
+                h.update(f.read(SAMPLE_SIZE))
+        else:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(chunk)
+    key = f"{path}|{st.st_size}|{st.st_mtime_ns}|{h.hexdigest()}"
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _to_le(arr):
+    if sys.byteorder == 'big':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _from_le(data, count):
+    arr = array('i')
+    arr.frombytes(data)
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    if len(arr) != count:
+        raise ValueError("truncated caption cache file")
+    return arr
+
+
+def dump_track(track, f):
+    """Write a track as header + int32 starts/ends/offsets + utf-8 text (+ word timings)"""
+    starts, ends, offsets, text = track.columns()
+    data = text.encode('utf-8')
+    f.write(HEADER.pack(MAGIC, VERSION, track.caption_type, len(starts), len(data)))
+    f.write(_to_le(starts))
+    f.write(_to_le(ends))
+    f.write(_to_le(offsets))
+    f.write(data)
+    if track.caption_type == CaptionType.YOUTUBE_AUTO_GENERATED:
+        word_index = getattr(track, 'word_index', None)
+        word_times = getattr(track, 'word_times', None)
+        if word_index is None:
+            word_index, word_times = array('i', [0] * (len(starts) + 1)), array('i')
+        f.write(WORDS.pack(len(word_times)))
+        f.write(_to_le(word_index))
+        f.write(_to_le(word_times))
+
+
+def load_track(f):
+    magic, version, caption_type, count, text_size = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a caption cache file")
+    starts = _from_le(f.read(count * 4), count)
+    ends = _from_le(f.read(count * 4), count)
+    offsets = _from_le(f.read((count + 1) * 4), count + 1)
+    text = f.read(text_size).decode('utf-8')
+    if caption_type == CaptionType.YOUTUBE_AUTO_GENERATED:
+        words, = WORDS.unpack(f.read(WORDS.size))
+        word_index = _from_le(f.read((count + 1) * 4), count + 1)
+        word_times = _from_le(f.read(words * 4), words)
+        return RollupCaptionTrack.from_columns(starts, ends, offsets, text, caption_type, word_index, word_times)
+    return CaptionTrack.from_columns(starts, ends, offsets, text, caption_type)
+
+
+class CaptionCache:
+    """On-disk cache of parsed and post-processed caption tracks, one file per fingerprint"""
+
+    def __init__(self, cache_dir=CACHE_DIR, limit=CACHE_LIMIT, sync_limit=SYNC_LIMIT):
+        self.cache_dir = Path(cache_dir)
+        self.limit = limit
+        self.sync_limit = sync_limit
+
+    def _entry(self, key):
+        return self.cache_dir / f"{key}.cap"
+
+    def _sync_entry(self, key):
+        # kept apart from the .cap file: a few bytes, rewritten on every adjustment.
+        # evict() ages it in the same LRU as the tracks and keeps at most sync_limit of them
+        return self.cache_dir / f"{key}.sync"
+
+    def load_sync(self, key):
+        """(offset, drift) saved for a track, (0, 0.0) if it was never adjusted"""
+        entry = self._sync_entry(key)
+        try:
+            with open(entry, 'rb') as f:
+                sync = SYNC.unpack(f.read(SYNC.size))
+            # touch for LRU, evict() drops sync files with the tracks
+            os.utime(entry)
+            return sync
+        except FileNotFoundError:
+            return 0, 0.0
+        except Exception as e:
+            print(f"Error reading caption sync: {str(e)}")
+            return 0, 0.0
+
+    def store_sync(self, key, offset, drift):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            entry = self._sync_entry(key)
+            if not offset and not drift:
+                entry.unlink(missing_ok=True)
+                return
+            tmp = entry.with_suffix('.synctmp')
+            with open(tmp, 'wb') as f:
+                f.write(SYNC.pack(int(offset), float(drift)))
+            os.replace(tmp, entry)
+        except Exception as e:
+            print(f"Error writing caption sync: {str(e)}")
+
+    def load(self, key):
+        entry = self._entry(key)
+        try:
+            with open(entry, 'rb') as f:
+                track = load_track(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading caption cache: {str(e)}")
+            return None
+        # touch for LRU
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return track
+
+    def store(self, key, track):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            entry = self._entry(key)
+            tmp = entry.with_suffix('.tmp')
+            with open(tmp, 'wb') as f:
+                dump_track(track, f)
+            os.replace(tmp, entry)
+            self.evict()
+        except Exception as e:
+            print(f"Error writing caption cache: {str(e)}")
+
+    def evict(self):
+        entries = []
+        total = 0
+        syncs = []
+        for entry in [*self.cache_dir.glob('*.cap'), *self.cache_dir.glob('*.sync')]:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry))
+            if entry.suffix == '.sync':
+                syncs.append((st.st_mtime, entry))
+            total += st.st_size
+        entries.sort()
+        syncs.sort()
+        stale = {entry for _, entry in syncs[:max(0, len(syncs) - self.sync_limit)]}
+        for _, size, entry in entries:
+            if total <= self.limit and entry not in stale:
+                continue
+            try:
+                entry.unlink()
+                total -= size
+            except OSError:
+                pass
+
+
+GLOBAL_CAPTION_CACHE = CaptionCache()
@@ -1,8 +1,25 @@
+import math
 import time
 import os
+import sys
+import threading
+from collections import OrderedDict
+from array import array
+from bisect import bisect_right
+
 import webvtt
-import tempfile
-import pysrt
+
+from .track import CaptionTrack, CaptionType
+from .parser import parse_subtitle_string, parse_subtitle_file
+from .lazy import MappedCaptionTrack, LAZY_LOAD_SIZE
+from .cache import GLOBAL_CAPTION_CACHE, file_fingerprint
+from .rollup import normalize_rollup
+from .search import CaptionSearchIndex
+from .sentence import SentenceIndex
+from .tokens import TrackTokens
+from .prefetch import DictionaryPrefetcher
+from .difficulty import TrackDifficulty
+from .ass import parse_ass_file, parse_ass_string
 
 def convert_srt_to_vtt(srt_file, delete_srt=False):
     """Convert SRT file to VTT format"""
@@ -20,74 +37,421 @@ def convert_srt_to_vtt(srt_file, delete_srt=False):
         return None
 
 
-# define enum for caption type
-class CaptionType:
-    YOUTUBE_AUTO_GENERATED = 1
-    NORMAL = 2
-
 def parse_srt_string(srt_string):
-    captions = []
-    i = 0
-    
     try:
-        subs = pysrt.from_string(srt_string)
-        for sub in subs:
-            caption = webvtt.Caption(
-                start=f"{sub.start.hours:02d}:{sub.start.minutes:02d}:{sub.start.seconds:02d}.{sub.start.milliseconds:03d}",
-                end=f"{sub.end.hours:02d}:{sub.end.minutes:02d}:{sub.end.seconds:02d}.{sub.end.milliseconds:03d}",
-                text=sub.text
-            )
-            x = {'caption': caption, 'seq': i}
-            i += 1
-            x['caption'].start_in_milliseconds = time_to_milliseconds(caption.start)
-            x['caption'].end_in_milliseconds = time_to_milliseconds(caption.end)
-            captions.append(x)
-        
-        return captions
+        return parse_subtitle_string(srt_string)
     except Exception as e:
         print(f"Error parsing SRT string: {str(e)}")
-        return captions
+        return CaptionTrack()
 
-def get_captions(subtitle_file):
-    captions = []
-    i = 0
+def get_captions(subtitle_file, cache=GLOBAL_CAPTION_CACHE):
+    captions = CaptionTrack()
     _type = CaptionType.NORMAL
     # Check file extension
     file_ext = os.path.splitext(subtitle_file)[1].lower()
-    vtt_file = subtitle_file
-    
-    if file_ext == '.srt':
-        print("Converting SRT to VTT format...")
-        vtt_file = convert_srt_to_vtt(subtitle_file)
-        if not vtt_file:
-            print("Failed to convert SRT file")
-            return captions
-    elif file_ext != '.vtt':
-        print("Unsupported subtitle format. Please use .vtt or .srt files")
-        return captions
-    
-    # Read the VTT file
-    for caption in webvtt.read(vtt_file):
-        x = {'caption': caption, 'seq': i}
-        i += 1
-        x['caption'].start_in_milliseconds = time_to_milliseconds(caption.start)
-        x['caption'].end_in_milliseconds = time_to_milliseconds(caption.end)
-        captions.append(x)
-        # check if raw text contains auto-generated text: <c> and </c>, only check first 10 raws
-        if i < 10 and '<c>' in caption.raw_text and '</c>' in caption.raw_text:
-            _type = CaptionType.YOUTUBE_AUTO_GENERATED
-        #print(caption.end_in_milliseconds, caption.raw_text, "\n")
+    if file_ext not in ('.srt', '.vtt', '.ass', '.ssa'):
+        print("Unsupported subtitle format. Please use .vtt, .srt or .ass files")
+        return captions, _type
 
+    key = None
+    if cache is not None:
+        try:
+            key = file_fingerprint(subtitle_file)
+            cached = cache.load(key)
+            if cached is not None:
+                cached.cache_key = key
+                cached.sync = cache.load_sync(key)
+                return cached, cached.caption_type
+        except OSError as e:
+            print(f"Error reading subtitle file: {str(e)}")
+            return captions, _type
+
+    # SRT and VTT share the same timing syntax, no need to convert SRT to VTT first
+    try:
+        if file_ext in ('.ass', '.ssa'):
+            captions = parse_ass_file(subtitle_file)
+        elif os.path.getsize(subtitle_file) > LAZY_LOAD_SIZE:
+            # huge transcripts: index the mapped file, decode texts while playing
+            captions = MappedCaptionTrack(subtitle_file)
+            if captions.caption_type == CaptionType.YOUTUBE_AUTO_GENERATED:
+                captions.scan_all()
+        else:
+            captions = parse_subtitle_file(subtitle_file)
+    except Exception as e:
+        print(f"Error reading subtitle file: {str(e)}")
+        return captions, _type
+
+    _type = captions.caption_type
     if _type == CaptionType.YOUTUBE_AUTO_GENERATED:
         print("Auto-generated captions detected")
-        # only keep odd index captions
-        captions = [c for c in captions if c['seq'] % 2 == 0]
-        # reorder seq
-        for i, c in enumerate(captions):
-            c['seq'] = i
+        # merge the rolled-up fragments into non-overlapping segments with their display text
+        source = captions
+        captions = normalize_rollup(source)
+        # the fragments are copied, a mapped source would keep the file open
+        source.close()
+
+    if key:
+        captions.cache_key = key
+        captions.sync = cache.load_sync(key)
+    if not captions.complete:
+        def scan_rest():
+            captions.scan_all()
+            if key and not captions.closed:
+                cache.store(key, captions)
+        threading.Thread(target=scan_rest, daemon=True).start()
+    elif key:
+        cache.store(key, captions)
     return captions, _type
 
-def find_caption(currentTime, captionList, cur_seq):
+class CaptionIntervalTree:
+    """
+    Centered interval tree over half-open [start, end) caption intervals.
+
+    Every node keeps the captions that contain its center twice, once sorted by start and
+    once by end (descending), so query(t) only walks one root-to-leaf path and stops
+    scanning a node's list at the first caption that is not active: O(log n + k).
+    `boundaries` holds every start and end time of the indexed captions, sorted.
+    """
+
+    def __init__(self, starts, ends, count=None):
+        self.starts = starts
+        self.ends = ends
+        # only the first `count` captions are indexed, the arrays may keep growing
+        self.count = len(starts) if count is None else count
+        # node = (center, by_start, by_end, left, right)
+        self.nodes = []
+        seqs = [i for i in range(self.count) if ends[i] > starts[i]]
+        seqs.sort(key=lambda i: starts[i])
+        self.root = self._build(seqs)
+        self.boundaries = array('i', sorted(set(starts[:self.count]) | set(ends[:self.count])))
+
+    def _build(self, seqs):
+        if not seqs:
+            return -1
+        starts, ends = self.starts, self.ends
+        center = starts[seqs[len(seqs) // 2]]
+        left, right, here = [], [], []
+        for i in seqs:
+            if ends[i] <= center:
+                left.append(i)
+            elif starts[i] > center:
+                right.append(i)
+            else:
+                here.append(i)
+        # seqs are sorted by start, so here is too
+        by_end = sorted(here, key=lambda i: ends[i], reverse=True)
+        node = len(self.nodes)
+        self.nodes.append(None)
+        self.nodes[node] = (center, here, by_end, self._build(left), self._build(right))
+        return node
+
+    def query(self, t):
+        """Return the seqs of all captions active at t, in caption order"""
+        starts, ends = self.starts, self.ends
+        ret = []
+        node = self.root
+        while node != -1:
+            center, by_start, by_end, left, right = self.nodes[node]
+            if t < center:
+                # every caption here ends after center > t
+                for i in by_start:
+                    if starts[i] > t:
+                        break
+                    ret.append(i)
+                node = left
+            else:
+                # every caption here starts at or before center <= t
+                for i in by_end:
+                    if ends[i] <= t:
+                        break
+                    ret.append(i)
+                node = right
+        ret.sort()
+        return ret
+
+
+def caption_columns(captionList):
+    """(starts, ends) arrays of a caption list, columnar tracks already hold them"""
+    if isinstance(captionList, CaptionTrack):
+        return captionList.starts, captionList.ends
+    return (array('i', [c['caption'].start_in_milliseconds for c in captionList]),
+            array('i', [c['caption'].end_in_milliseconds for c in captionList]))
+
+
+class CaptionIndex:
+    """
+    Sorted lookup structure over a caption list, built once per load.
+
+    `max_ends[i]` is the largest end time among captions 0..i, so it is non-decreasing
+    even when captions overlap, and the first i with max_ends[i] > t is exactly the first
+    caption whose end is past t (the rule find_caption has always used).  That makes a
+    lookup a single bisect; between boundaries the answer is cached so playback ticks
+    that stay inside the current caption cost O(1).
+
+    Overlapping captions are answered by active(t) through a CaptionIntervalTree; the set
+    of active captions only changes at a start or end time, so it is cached per segment
+    between two consecutive boundaries.  Building the tree takes a second or more on a
+    large track, so with start_worker it is built off the GUI thread and swapped in when
+    done; until then active(t) scans the max_ends bisect window of the captions it misses.
+
+    A CaptionTrack may still be growing while it is indexed (lazy scans, streaming
+    extraction).  New captions are picked up on the next query: max_ends is extended in
+    O(new), and the tree is rebuilt once the track has doubled or is complete; until then
+    the not yet indexed tail is checked with two bisects.
+
+    Subtitle sync (set_sync) is applied to the query time only: the arrays, the tree and
+    the cached windows all stay in track time, so changing it is O(1).
+    """
+
+    def __init__(self, captionList, start_worker=None):
+        """
+        :param start_worker: start_worker(func) runs func in a background thread (a Worker in
+            main.py), None builds the tree in place
+        """
+        self.captions = captionList
+        self.starts, self.ends = caption_columns(captionList)
+        self.max_ends = array('i')
+        self._lock = threading.Lock()
+        self._tree_lock = threading.Lock()
+        self._start_worker = start_worker
+        self._tree_pending = False
+        # swapped in one assignment, readers take a local reference
+        self.tree = CaptionIntervalTree(self.starts, self.ends, 0)
+        self._reset_cache()
+        self._sync()
+        self._request_tree()
+        self.set_sync(*getattr(captionList, 'sync', (0, 0.0)))
+
+    def set_sync(self, offset=0, drift=0.0):
+        """
+        Show the caption at track time c at media time c * (1 + drift) + offset.
+        :param offset: milliseconds, positive delays the captions
+        :param drift: linear stretch, e.g. 0.001 when captions fall 60ms behind per minute
+        """
+        self.offset = int(offset)
+        self.drift = float(drift)
+        self.shifted = bool(self.offset or self.drift)
+
+    def to_track_time(self, t):
+        """Media time to the time axis of the caption file"""
+        if not self.shifted:
+            return t
+        return int((t - self.offset) / (1 + self.drift))
+
+    def to_media_time(self, c):
+        """Caption file time to media time, rounded up so a boundary is never early"""
+        if not self.shifted:
+            return c
+        return math.ceil(c * (1 + self.drift) + self.offset)
+
+    def _reset_cache(self):
+        # [_lo, _hi) is the time window in which _seq stays the answer
+        self._seq = -1
+        self._lo = 0
+        self._hi = -1
+        # same for the set of active captions
+        self._active = []
+        self._active_lo = 0
+        self._active_hi = -1
+
+    def _sync(self):
+        """Extend max_ends to the captions added since the last query"""
+        with self._lock:
+            n = len(self.captions)
+            max_ends = self.max_ends
+            if n == len(max_ends):
+                return
+            max_end = max_ends[-1] if max_ends else -1
+            for end in self.ends[len(max_ends):n]:
+                if end > max_end:
+                    max_end = end
+                max_ends.append(max_end)
+            self._reset_cache()
+
+    def _request_tree(self):
+        """(Re)build the tree over the captions synced so far, in start_worker if there is one"""
+        if self._start_worker is None:
+            self.build_tree()
+        elif not self._tree_pending:
+            self._tree_pending = True
+            self._start_worker(self.build_tree)
+
+    def build_tree(self):
+        """Index the synced captions in a new tree and swap it in, safe to run in a worker"""
+        try:
+            with self._tree_lock:
+                n = len(self.max_ends)
+                if n > self.tree.count:
+                    self.tree = CaptionIntervalTree(self.starts, self.ends, n)
+        finally:
+            self._tree_pending = False
+
+    def __len__(self):
+        return len(self.captions)
+
+    def __getitem__(self, seq):
+        return self.captions[seq]
+
+    def lookup(self, t):
+        """Return the seq of the caption to show at t, or -1 after the last caption"""
+        if len(self.captions) != len(self.max_ends):
+            self._sync()
+        if self.shifted:
+            t = self.to_track_time(t)
+        if self._lo <= t < self._hi:
+            return self._seq
+        max_ends = self.max_ends
+        seq = bisect_right(max_ends, t)
+        if seq >= len(max_ends):
+            self._seq = -1
+            self._lo = max_ends[-1] if max_ends else 0
+            self._hi = 1 << 62
+            return -1
+        self._seq = seq
+        self._lo = max_ends[seq - 1] if seq > 0 else -(1 << 62)
+        self._hi = max_ends[seq]
+        return seq
+
+    def active(self, t):
+        """Return the seqs of all captions with start <= t < end"""
+        if len(self.captions) != len(self.max_ends):
+            self._sync()
+        if self.shifted:
+            t = self.to_track_time(t)
+        if self._active_lo <= t < self._active_hi:
+            return self._active
+        n = len(self.max_ends)
+        tree = self.tree
+        indexed = tree.count
+        if indexed < n and not self._tree_pending and (n >= 2 * indexed or getattr(self.captions, 'complete', True)):
+            self._request_tree()
+            tree = self.tree
+            indexed = tree.count
+        active = tree.query(t)
+        boundaries = tree.boundaries
+        i = bisect_right(boundaries, t)
+        lo = boundaries[i - 1] if i > 0 else -(1 << 62)
+        hi = boundaries[i] if i < len(boundaries) else 1 << 62
+        if indexed < n:
+            # captions past the tree come in start order: only [first end > t, last start <= t)
+            # of the tail can be active
+            first = max(indexed, bisect_right(self.max_ends, t))
+            last = bisect_right(self.starts, t, indexed, n)
+            active.extend(seq for seq in range(first, last) if self.ends[seq] > t)
+            # the cache is only safe before the tail starts
+            hi = min(hi, self.starts[indexed]) if last == indexed else -(1 << 62)
+        self._active = active
+        self._active_lo = lo
+        self._active_hi = hi
+        return active
+
+    def next_boundary(self, t):
+        """First start or end time after t (where the shown captions may change), None if none"""
+        if len(self.captions) != len(self.max_ends):
+            self._sync()
+        if self.shifted:
+            t = self.to_track_time(t)
+        tree = self.tree
+        boundaries = tree.boundaries
+        i = bisect_right(boundaries, t)
+        boundary = boundaries[i] if i < len(boundaries) else None
+        indexed = tree.count
+        if indexed < len(self.max_ends):
+            # the unindexed tail comes in start order
+            q = bisect_right(self.starts, t, indexed, len(self.max_ends))
+            if q < len(self.max_ends) and (boundary is None or self.starts[q] < boundary):
+                boundary = self.starts[q]
+            # and its captions active at t end somewhere in between
+            for seq in range(max(indexed, bisect_right(self.max_ends, t)), q):
+                end = self.ends[seq]
+                if t < end and (boundary is None or end < boundary):
+                    boundary = end
+        if hasattr(self.captions, 'next_word_time'):
+            # word highlighting changes at every word start as well
+            seq = bisect_right(self.max_ends, t)
+            if seq < len(self.max_ends):
+                word_time = self.captions.next_word_time(seq, t)
+                if word_time is not None and (boundary is None or word_time < boundary):
+                    boundary = word_time
+        if boundary is not None and self.shifted:
+            boundary = self.to_media_time(boundary)
+        return boundary
+
+    def current_word(self, t):
+        """Return (seq, word) spoken at t, word is -1 when the track has no word timings there"""
+        seq = self.lookup(t)
+        if seq == -1 or not hasattr(self.captions, 'current_word'):
+            return seq, -1
+        return seq, self.captions.current_word(seq, self.to_track_time(t))
+
+    def find(self, t):
+        seq = self.lookup(t)
+        if seq == -1:
+            return None
+        return self.captions[seq]
+
+
+def align_tracks(starts, ends, second_starts, second_ends, partner=None, j=0):
+    """
+    Pair every caption of one track with the caption of a second track it overlaps most.
+
+    Both tracks are walked once in start order, like a merge: j only moves past second
+    captions that end before the current caption starts, so the whole alignment is
+    O(n + m) as long as each caption overlaps a bounded number of the other track's.
+    :param partner: array to extend (resume an alignment of a growing track)
+    :param j: second track position to resume from
+    :return: (partner, j), partner[i] is the second track seq for caption i or -1
+    """
+    if partner is None:
+        partner = array('i')
+    m = len(second_starts)
+    for i in range(len(partner), len(starts)):
+        start, end = starts[i], ends[i]
+        while j < m and second_ends[j] <= start:
+            j += 1
+        best, best_overlap = -1, 0
+        k = j
+        while k < m and second_starts[k] < end:
+            overlap = min(end, second_ends[k]) - max(start, second_starts[k])
+            if overlap > best_overlap:
+                best, best_overlap = k, overlap
+            k += 1
+        partner.append(best)
+    return partner, j
+
+
+class DualCaptionIndex(CaptionIndex):
+    """
+    CaptionIndex over a primary track that also serves the aligned caption of a second track
+    (e.g. English + Chinese).  The alignment is one merge pass at build time, so a lookup is
+    still a bisect plus an array read.
+    """
+
+    def __init__(self, captionList, secondary, start_worker=None):
+        super().__init__(captionList, start_worker)
+        self.secondary = secondary
+        self._second_starts, self._second_ends = caption_columns(secondary)
+        self._partner, self._j = align_tracks(self.starts, self.ends, self._second_starts, self._second_ends)
+
+    def partner(self, seq):
+        """Seq of the secondary caption aligned with primary caption seq, -1 if none"""
+        if seq >= len(self._partner):
+            # the primary track grew since the last alignment
+            self._partner, self._j = align_tracks(self.starts, self.ends, self._second_starts,
+                                                  self._second_ends, self._partner, self._j)
+        return self._partner[seq]
+
+    def pair(self, t):
+        """Return (primary seq, secondary seq) to show at t, -1 where there is none"""
+        seq = self.lookup(t)
+        if seq == -1:
+            return -1, -1
+        return seq, self.partner(seq)
+
+
+def find_caption(currentTime, captionList, cur_seq, index=None):
+    if index is not None:
+        return index.find(currentTime)
     seq = -1
     # get max seq form set
     if cur_seq and len(cur_seq) > 0:
@@ -106,19 +470,24 @@ def find_caption(currentTime, captionList, cur_seq):
     return None
 
 
-def find_captions(currentTime, captionList, cur_seq):
-    seq = -1
-    # get max seq form set
-    if cur_seq and len(cur_seq) > 0:
-        seq = max(cur_seq)
-    # find 2 captions which end time is greater than currentTime
-    start = 0
-    if seq != -1:
-        start = seq
-    for i in range(start, len(captionList)):
-        if captionList[i]['caption'].end_in_milliseconds > currentTime:
-            seq = i
-            break
+def find_captions(currentTime, captionList, cur_seq, index=None):
+    if index is not None:
+        seq = index.lookup(currentTime)
+        if seq == -1:
+            seq = len(captionList)
+    else:
+        seq = -1
+        # get max seq form set
+        if cur_seq and len(cur_seq) > 0:
+            seq = max(cur_seq)
+        # find 2 captions which end time is greater than currentTime
+        start = 0
+        if seq != -1:
+            start = seq
+        for i in range(start, len(captionList)):
+            if captionList[i]['caption'].end_in_milliseconds > currentTime:
+                seq = i
+                break
     if seq < len(captionList) - 1:
         return captionList[seq], captionList[seq+1]
     elif seq == len(captionList) - 1:
@@ -206,6 +575,111 @@ def get_template(t_type, txt):
         # throw error
         return None
 
+
+def caption_text_html(text, roll_up=False):
+    """Sanitize caption text for the caption template"""
+    # the text is a format() argument, its braces need no escaping
+    text = text.replace('&nbsp;', ' ')
+    # roll-up captions keep their two lines, others are shown on one line
+    return text.replace('\n', '<br>' if roll_up else ' ')
+
+
+def highlight_word(display_text, word):
+    """Roll-up display text with one word of its last line marked"""
+    prev, _, line = display_text.rpartition('\n')
+    words = line.split()
+    if word < len(words):
+        words[word] = f'<span style="color: #f5c518;">{words[word]}</span>'
+    html = caption_text_html(' '.join(words))
+    return caption_text_html(prev) + '<br>' + html if prev else html
+
+
+class CaptionRenderer:
+    """
+    Memoized caption HTML.
+
+    render() returns the full caption document for a set of displayed captions and keeps
+    it in an LRU bounded by the memory of the cached strings, so a playback tick that
+    switches captions never runs the str.replace / template formatting twice for the same
+    caption.  Keys carry the id of the caption list, clear() it when the list is replaced.
+    """
+
+    def __init__(self, max_bytes=4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        # TrackDifficulty of the current track, its hard words are highlighted
+        self.difficulty = None
+        self._cache = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._size = 0
+
+    def render(self, captions, seqs, word=-1):
+        """
+        :param word: word of the (single) roll-up caption to highlight, -1 for none
+        """
+        key = (id(captions), tuple(seqs), word)
+        with self._lock:
+            html = self._cache.get(key)
+            if html is not None:
+                self._cache.move_to_end(key)
+                return html
+        if hasattr(captions, 'display_text'):
+            # roll-up track: one segment with its precomputed two-line text
+            if word >= 0 and len(seqs) == 1:
+                texts = [highlight_word(captions.display_text(seqs[0]), word)]
+            else:
+                texts = [caption_text_html(captions.display_text(seq), roll_up=True) for seq in seqs]
+        else:
+            # overlapping captions (two speakers, signs) are shown one per line
+            texts = [self._caption_text(captions, seq) for seq in seqs]
+        html = get_template("caption", "<br>".join(texts))
+        self._put(key, html)
+        return html
+
+    def _caption_text(self, captions, seq):
+        text = captions[seq]['caption'].text
+        difficulty = self.difficulty
+        if difficulty is None or difficulty.tokens.captions is not captions:
+            return caption_text_html(text)
+        parts = []
+        pos = 0
+        for start, end in difficulty.hard_spans(seq):
+            parts.append(text[pos:start])
+            parts.append(f'<span style="color: #c0392b;">{text[start:end]}</span>')
+            pos = end
+        parts.append(text[pos:])
+        return caption_text_html(''.join(parts))
+
+    def render_dual(self, captions, seqs, secondary, second_seqs):
+        """Primary captions with the aligned captions of a second track below them"""
+        key = (id(captions), tuple(seqs), id(secondary), tuple(second_seqs))
+        with self._lock:
+            html = self._cache.get(key)
+            if html is not None:
+                self._cache.move_to_end(key)
+                return html
+        texts = [self._caption_text(captions, seq) for seq in seqs]
+        second_texts = [caption_text_html(secondary[seq]['caption'].text) for seq in second_seqs]
+        text = "<br>".join(texts)
+        if second_texts:
+            text += '<br><span style="font-size: 22px; color: #666666;">' + "<br>".join(second_texts) + '</span>'
+        html = get_template("caption", text)
+        self._put(key, html)
+        return html
+
+    def _put(self, key, html):
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = html
+                self._size += sys.getsizeof(html)
+            while self._size > self.max_bytes and len(self._cache) > 1:
+                _, old = self._cache.popitem(last=False)
+                self._size -= sys.getsizeof(old)
+
 # content_type enum
 class LookUpType:
     WORD = 1
@@ -231,32 +705,17 @@ def get_captions_from_string(subtitle_content, content_format='srt'):
     """
     Parse captions from a subtitle string
     :param subtitle_content: String containing subtitle content
-    :param content_format: Format of the subtitle content ('srt' or 'vtt')
-    :return: List of caption objects
+    :param content_format: Format of the subtitle content ('srt', 'vtt' or 'ass')
+    :return: CaptionTrack of the parsed captions
     """
+    content_format = content_format.lower()
+    if content_format not in ('srt', 'vtt', 'ass', 'ssa'):
+        print("Unsupported subtitle format. Please use VTT, SRT or ASS content")
+        return CaptionTrack()
     try:
-        # Convert SRT content to VTT if needed
-        if content_format.lower() == 'srt':
-            captions = parse_srt_string(subtitle_content)
-            return captions
-        elif content_format.lower() == 'vtt':
-            pass
-        else:
-            print("Unsupported subtitle format. Please use VTT or SRT content")
-            return []
-
-        captions = []
-        i = 0
-        for caption in webvtt.from_string(subtitle_content):
-            x = {'caption': caption, 'seq': i}
-            i += 1
-            x['caption'].start_in_milliseconds = time_to_milliseconds(caption.start)
-            x['caption'].end_in_milliseconds = time_to_milliseconds(caption.end)
-            captions.append(x)
-
-        
+        if content_format in ('ass', 'ssa'):
+            return parse_ass_string(subtitle_content)
+        return parse_subtitle_string(subtitle_content)
     except Exception as e:
         print(f"Error parsing subtitle content: {str(e)}")
-        # Attempt to clean up any temporary files that might still exist
-        return []
-
+        return CaptionTrack()
@@ -0,0 +1,119 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .prefetch import BATCH_KEYS
+
+# exam tags of ECDICT from easiest to hardest, a word takes the easiest one it has
+TAG_LEVELS = {
+    'zk': 0.1,
+    'gk': 0.25,
+    'cet4': 0.4,
+    'cet6': 0.55,
+    'ky': 0.65,
+    'ielts': 0.7,
+    'toefl': 0.75,
+    'gre': 0.95,
+}
+# frequency rank treated as "as rare as it gets"
+MAX_RANK = 50000
+
+
+class TrackDifficulty:
+    """
+    Vocabulary difficulty of a tokenized track, computed with NumPy over the whole track.
+
+    Every distinct lemma of the TrackTokens is fetched with a few query_batch calls, its
+    frq/bnc ranks, collins stars, oxford flag and exam tags become columns of arrays, and a
+    difficulty in [0, 1] is computed per lemma in one go.  Per-cue and per-track scores are
+    segment sums over the token arrays (cumsum + cue_index), no Python loop per token.
+
+    coverage is the share of dictionary words within the first known_rank words by
+    frequency (the usual "you know 95% of the words" measure), difficulty the mean word
+    difficulty.  Words missing from the dictionary (names, numbers) are not counted.
+    """
+
+    def __init__(self, tokens, star_dict, known_rank=5000, hard=0.6):
+        self.tokens = tokens
+        self.star_dict = star_dict
+        self.known_rank = known_rank
+        self.hard = hard
+        self.word_difficulty = None
+        self.cue_difficulty = None
+        self.cue_coverage = None
+        self.difficulty = 0.0
+        self.coverage = 0.0
+        self.hard_ratio = 0.0
+        self._hard_lemmas = None
+
+    def _fetch(self, lemmas):
+        entries = []
+        for i in range(0, len(lemmas), BATCH_KEYS):
+            entries.extend(self.star_dict.query_batch(lemmas[i:i + BATCH_KEYS]))
+        return entries
+
+    def build(self):
+        if np is None or self.star_dict is None:
+            print("numpy or dictionary not available, skip difficulty")
+            return self
+        tokens = self.tokens
+        # snapshot the tokens first, every lemma id in them is then below len(lemmas)
+        cue_index = np.frombuffer(tokens.cue_index, dtype=np.int32).copy()
+        token_lemmas = np.frombuffer(tokens.token_lemmas, dtype=np.int32)[:cue_index[-1]].copy()
+        lemmas = list(tokens.lemmas)
+        entries = self._fetch(lemmas)
+        n = len(entries)
+        found = np.fromiter((e is not None for e in entries), dtype=bool, count=n)
+        frq = np.fromiter(((e or {}).get('frq') or 0 for e in entries), dtype=np.float64, count=n)
+        bnc = np.fromiter(((e or {}).get('bnc') or 0 for e in entries), dtype=np.float64, count=n)
+        collins = np.fromiter(((e or {}).get('collins') or 0 for e in entries), dtype=np.float64, count=n)
+        oxford = np.fromiter((bool((e or {}).get('oxford')) for e in entries), dtype=bool, count=n)
+        tag = np.fromiter((min((TAG_LEVELS[t] for t in ((e or {}).get('tag') or '').split() if t in TAG_LEVELS),
+                               default=np.nan) for e in entries), dtype=np.float64, count=n)
+
+        # best (smallest) known rank of the two corpora, unknown counts as rarest
+        rank = np.where(frq > 0, frq, MAX_RANK)
+        rank = np.minimum(rank, np.where(bnc > 0, bnc, MAX_RANK))
+        rank_score = np.clip(np.log(rank) / np.log(MAX_RANK), 0, 1)
+        collins_score = 1 - np.clip(collins, 0, 5) / 5
+        # the exam tag weighs in only where there is one
+        has_tag = ~np.isnan(tag)
+        score = np.where(has_tag,
+                         0.5 * rank_score + 0.2 * collins_score + 0.3 * np.nan_to_num(tag),
+                         (0.5 * rank_score + 0.2 * collins_score) / 0.7)
+        score = np.where(oxford, score * 0.5, score)
+        self.word_difficulty = np.where(found, score, 0)
+        self._hard_lemmas = found & (score >= self.hard)
+
+        tok_found = found[token_lemmas]
+        tok_score = self.word_difficulty[token_lemmas]
+        tok_known = tok_found & (rank[token_lemmas] <= self.known_rank)
+        tok_hard = self._hard_lemmas[token_lemmas]
+
+        def per_cue(values):
+            sums = np.concatenate(([0], np.cumsum(values, dtype=np.float64)))
+            return sums[cue_index[1:]] - sums[cue_index[:-1]]
+
+        counts = per_cue(tok_found)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.cue_difficulty = np.nan_to_num(per_cue(tok_score) / counts)
+            self.cue_coverage = np.where(counts > 0, per_cue(tok_known) / counts, 1.0)
+        total = tok_found.sum()
+        if total:
+            self.difficulty = float(tok_score.sum() / total)
+            self.coverage = float(tok_known.sum() / total)
+            self.hard_ratio = float(tok_hard.sum() / total)
+        return self
+
+    def is_hard(self, lemma_id):
+        return self._hard_lemmas is not None and lemma_id < len(self._hard_lemmas) and bool(self._hard_lemmas[lemma_id])
+
+    def hard_spans(self, seq):
+        """(start, end) of the hard words of cue seq, for highlighting"""
+        tokens = self.tokens
+        if self._hard_lemmas is None or not tokens.indexed(seq):
+            return []
+        return [(tokens.token_starts[i], tokens.token_ends[i])
+                for i in range(tokens.cue_index[seq], tokens.cue_index[seq + 1])
+                if self.is_hard(tokens.token_lemmas[i])]
@@ -1,22 +1,221 @@
+import codecs
+import hashlib
+import json
 import os
 import subprocess
 import sys
+import tempfile
+import threading
+from collections import OrderedDict
 
 import ffmpeg
 import base64
 
+from .ass import AssStreamParser
+from .cache import CACHE_DIR
+from .mkv import read_mkv_subtitle, read_mkv_head, CODEC_NAMES, TRACK_TYPE_VIDEO, TRACK_TYPE_AUDIO, \
+    TRACK_TYPE_SUBTITLE
+from .parser import SubtitleStreamParser
+from .track import CaptionTrack
+
+# text codecs that are pulled out as they are (stream copy) instead of converted to SRT
+COPY_CODECS = {'ass': 'ass', 'ssa': 'ass'}
+# codecs that end up as text, bitmap subtitles (PGS, VobSub) can't be converted to SRT
+TEXT_SUBTITLE_CODECS = {'subrip', 'srt', 'ass', 'ssa', 'webvtt', 'text', 'mov_text'}
+
+MATROSKA_EXTS = ('.mkv', '.mka', '.mks', '.webm')
+
+# ffprobe results, next to the caption cache
+PROBE_CACHE_DIR = CACHE_DIR.parent / 'probe'
+PROBE_VERSION = 1
+# probe files are a few hundred bytes, keep at most this many (least recently used go first)
+PROBE_LIMIT = 1000
+# results kept in memory for the files reopened in this session
+PROBE_MEMORY_LIMIT = 64
+# the only fields we read, ffprobe skips everything else (side data, dispositions, ...)
+PROBE_ENTRIES = 'stream=index,codec_type,codec_name,width,height:stream_tags=language,title:format=duration'
+
+
+def media_fingerprint(path, head=64 * 1024):
+    """Cheap key of a media file: path, size, mtime and a hash of the first and last 64KB"""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{path}|{st.st_size}|{st.st_mtime_ns}".encode('utf-8'))
+    with open(path, 'rb') as f:
+        h.update(f.read(head))
+        if st.st_size > head * 2:
+            f.seek(-head, os.SEEK_END)
+            h.update(f.read(head))
+    return h.hexdigest()
+
+
+def run_ffprobe(video_path):
+    """ffprobe limited to PROBE_ENTRIES, the raw JSON dict"""
+    cmd = ['ffprobe', '-v', 'error', '-of', 'json', '-show_entries', PROBE_ENTRIES, video_path]
+    process = popen_hidden(cmd)
+    out, err = process.communicate()
+    if process.returncode != 0:
+        raise ffmpeg.Error('ffprobe', out, err)
+    return json.loads(out.decode('utf-8'))
+
+
+def media_info_from_probe(metadata):
+    """
+    Everything the player needs from one probe:
+    tracks      [(sub_index, codec, language)] of the subtitle streams, sub_index is the 0:s:N index
+    width/height of the first video stream, None for audio-only files
+    duration    seconds, 0.0 if unknown
+    languages   {'audio': [...], 'subtitle': [...]} language tags in stream order
+    """
+    streams = metadata.get('streams', [])
+    tracks = []
+    languages = {'audio': [], 'subtitle': []}
+    width = height = None
+    for stream in streams:
+        codec_type = stream.get('codec_type')
+        language = stream.get('tags', {}).get('language', 'unknown')
+        if codec_type == 'subtitle':
+            tracks.append((len(tracks), stream.get('codec_name', 'unknown'), language))
+        elif codec_type == 'video' and width is None and stream.get('width'):
+            width, height = stream['width'], stream['height']
+        if codec_type in languages:
+            languages[codec_type].append(language)
+    try:
+        duration = float(metadata.get('format', {}).get('duration', 0))
+    except ValueError:
+        duration = 0.0
+    return {'tracks': tracks, 'width': width, 'height': height, 'duration': duration, 'languages': languages}
+
+
+def media_info_from_mkv(head):
+    """media_info_from_probe for a parsed Matroska head (mkv.read_mkv_head), no ffprobe involved"""
+    tracks = []
+    languages = {'audio': [], 'subtitle': []}
+    width = height = None
+    for track in head['tracks']:
+        if track['type'] == TRACK_TYPE_SUBTITLE:
+            codec = CODEC_NAMES.get(track['codec'], track['codec'].lower() or 'unknown')
+            tracks.append((len(tracks), codec, track['language']))
+            languages['subtitle'].append(track['language'])
+        elif track['type'] == TRACK_TYPE_AUDIO:
+            languages['audio'].append(track['language'])
+        elif track['type'] == TRACK_TYPE_VIDEO and width is None and track.get('width'):
+            width, height = track['width'], track['height']
+    return {'tracks': tracks, 'width': width, 'height': height, 'duration': head['duration'] / 1000,
+            'languages': languages}
+
+
+class MediaInfoCache:
+    """
+    On-disk cache of media_info_from_probe results, one small JSON file per media fingerprint.
+    Only the ffprobe fallback uses it, probe_media answers Matroska/WebM files from their header.
+    Both the files and the in-memory copies are LRU, at most limit and memory_limit of them.
+    """
+
+    def __init__(self, cache_dir=PROBE_CACHE_DIR, limit=PROBE_LIMIT, memory_limit=PROBE_MEMORY_LIMIT):
+        self.cache_dir = cache_dir
+        self.limit = limit
+        self.memory_limit = memory_limit
+        self._memory = OrderedDict()
+
+    def _entry(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def _remember(self, key, info):
+        self._memory[key] = info
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_limit:
+            self._memory.popitem(last=False)
+
+    def load(self, key):
+        info = self._memory.get(key)
+        if info is not None:
+            self._memory.move_to_end(key)
+            return info
+        entry = self._entry(key)
+        try:
+            with open(entry, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # touch for LRU
+            os.utime(entry)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading probe cache: {str(e)}")
+            return None
+        if data.get('version') != PROBE_VERSION:
+            return None
+        info = data['info']
+        # json has no tuples
+        info['tracks'] = [tuple(track) for track in info['tracks']]
+        self._remember(key, info)
+        return info
+
+    def store(self, key, info):
+        self._remember(key, info)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            entry = self._entry(key)
+            tmp = entry.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'version': PROBE_VERSION, 'info': info}, f)
+            os.replace(tmp, entry)
+            self.evict()
+        except Exception as e:
+            print(f"Error writing probe cache: {str(e)}")
+
+    def evict(self):
+        entries = []
+        for entry in self.cache_dir.glob('*.json'):
+            try:
+                entries.append((entry.stat().st_mtime, entry))
+            except OSError:
+                continue
+        entries.sort()
+        for _, entry in entries[:max(0, len(entries) - self.limit)]:
+            try:
+                entry.unlink()
+            except OSError:
+                pass
+
+
+GLOBAL_MEDIA_INFO_CACHE = MediaInfoCache()
+
+
+def probe_media(video_path, cache=GLOBAL_MEDIA_INFO_CACHE):
+    """
+    Subtitle tracks, dimensions, duration and languages of a media file (see media_info_from_probe)
+    with a single ffprobe, reopening the same file is a cache hit and runs no ffprobe at all.
+    Matroska/WebM files are answered from their header alone, which is cheaper than the cache.
+    """
+    if os.path.splitext(video_path)[1].lower() in MATROSKA_EXTS:
+        try:
+            return media_info_from_mkv(read_mkv_head(video_path))
+        except Exception as e:
+            print(f"Error reading Matroska header, using ffprobe: {str(e)}")
+    key = None
+    if cache is not None:
+        try:
+            key = media_fingerprint(video_path)
+        except OSError as e:
+            print(f"Error reading media file: {str(e)}")
+        if key is not None:
+            info = cache.load(key)
+            if info is not None:
+                return info
+    info = media_info_from_probe(run_ffprobe(video_path))
+    if key is not None:
+        cache.store(key, info)
+    return info
+
 
 def get_video_dimensions(video_path):
     try:
-        probe = ffmpeg.probe(video_path)
-        video_stream = next((stream for stream in probe['streams'] if stream['codec_type'] == 'video'), None)
-
-        if video_stream:
-            width = video_stream['width']
-            height = video_stream['height']
-            return width, height
-        else:
+        info = probe_media(video_path)
+        if info['width'] is None:
             raise ValueError(f"No video stream found {video_path}")
+        return info['width'], info['height']
 
     except ffmpeg.Error as e:
         print("FFmpeg error:", e.stderr.decode())
@@ -24,29 +223,26 @@ def get_video_dimensions(video_path):
 
 
 def get_subtitle_tracks(video_path):
-    """ 获取视频文件的字幕轨道信息，并计算相对索引 """
-    metadata = ffmpeg.probe(video_path)
-    subtitle_tracks = []
-    lang_dict = {
-        "eng": "English",
-        "chi": "Chinese",
-        "zho": "Chinese",
-    }
-
-    # **找出所有字幕流的索引**
-    subtitle_streams = [
-        stream for stream in metadata['streams'] if stream['codec_type'] == 'subtitle'
-    ]
-
-    for sub_index, stream in enumerate(subtitle_streams):
-        # track_index = stream['index']  # FFmpeg 内部的索引（所有流中的索引）
-        codec_name = stream.get('codec_name', 'unknown')
-        language = stream['tags'].get('language', 'unknown') if 'tags' in stream else 'unknown'
-
-        subtitle_tracks.append((sub_index, codec_name, language))  # 这里返回的是相对索引 sub_index
-    return subtitle_tracks
+    """ 获取视频文件的字幕轨道信息 [(相对索引 sub_index, codec, language)] """
+    return probe_media(video_path)['tracks']
 
 def get_subtitle_tracks_v2(video_path):
+    """
+    Get subtitle tracks from video file, from the Matroska header for .mkv/.webm and with mkvinfo otherwise
+    Returns: list of dicts with track info {index, language}
+    """
+    if os.path.splitext(video_path)[1].lower() in MATROSKA_EXTS:
+        try:
+            # index is (track number, mkvmerge track id), the id is the position in Tracks
+            return [{'index': (track['number'], track_id), 'language': track['language'], 'type': 'subtitles'}
+                    for track_id, track in enumerate(read_mkv_head(video_path)['tracks'])
+                    if track['type'] == TRACK_TYPE_SUBTITLE]
+        except Exception as e:
+            print(f"Error reading Matroska header, using mkvinfo: {str(e)}")
+    return get_subtitle_tracks_mkvinfo(video_path)
+
+
+def get_subtitle_tracks_mkvinfo(video_path):
     """
     Get subtitle tracks from video file using mkvinfo
     Returns: list of dicts with track info {index, language}
@@ -105,25 +301,23 @@ def extract_subtitles(video_path, output_srt="output.srt", track_index=0):
 
 # "/home/ssx/code/youtube/test5.mkv"
 def extract_all(video_path):
-    """ 提取视频中的所有字幕轨道 """
-    tracks = get_subtitle_tracks(video_path)
+    """ 提取视频中的所有文本字幕轨道, 一次 ffmpeg 读完所有轨道 (图形字幕 PGS/VobSub 无法转成 srt) """
+    tracks = [track for track in get_subtitle_tracks(video_path) if track[1] in TEXT_SUBTITLE_CODECS]
+    base = os.path.splitext(video_path)[0]
+    targets = [(track[0], f"{base}_{track[0]}.srt", None) for track in tracks]
+    try:
+        print("extract indexes=", [track[0] for track in tracks])
+        run_multi_extract(video_path, targets)
+    except Exception as e:
+        print("提取字幕时出错:", e)
     paths = []
     langs = []
-
-    for track in tracks:
-
-        try:
-            t_index = track[0]
-            print("extract index=", t_index)
-            subtitle_name = f"{os.path.splitext(video_path)[0]}_{t_index}.srt"
-            extract_subtitles(video_path, subtitle_name, track_index=t_index)
+    for track, (_, subtitle_name, _) in zip(tracks, targets):
+        if os.path.exists(subtitle_name):
             paths.append(subtitle_name)
             langs.append(track[2])
-
-        except Exception as e:
-            print(f"提取字幕轨道  ({track}) 时出错:", e)
-        finally:
-            pass
+        else:
+            print(f"提取字幕轨道  ({track}) 时出错")
 
     return paths, langs
 
@@ -172,40 +366,100 @@ GLOBAL_EMBEDDING_RAW_CAPTION = {
 }
 
 
-def extract_subtitle_as_string(video_path, track_index=0):
+def subtitle_output_args(track_index, codec=None):
+    """ffmpeg output options for a subtitle track: ASS/SSA is stream-copied, the rest converted to SRT"""
+    if codec in COPY_CODECS:
+        return {'map': f'0:s:{track_index}', 'c:s': 'copy', 'format': COPY_CODECS[codec]}
+    return {'map': f'0:s:{track_index}', 'format': 'srt'}
+
+
+def run_multi_extract(video_path, targets, cancel_event=None):
+    """
+    Demux several subtitle tracks with one ffmpeg process: every (track_index, path, codec)
+    of targets becomes its own output of the same input, so the container is read once no
+    matter how many tracks are pulled out.
+    If that command fails the tracks are retried one ffmpeg each.
+    :param cancel_event: threading.Event, ffmpeg is killed when it is set
+    :return: True if ffmpeg finished normally (for at least one track after a retry)
+    """
+    if not targets:
+        return True
+    if _run_outputs(video_path, targets, cancel_event):
+        return True
+    if len(targets) == 1 or (cancel_event is not None and cancel_event.is_set()):
+        return False
+    # one output ffmpeg can't set up (a codec it can't convert) fails the whole command,
+    # don't let it take the other tracks down
+    print("Multi-track extraction failed, extracting the tracks one by one")
+    results = [_run_outputs(video_path, [target], cancel_event) for target in targets]
+    return any(results)
+
+
+def _run_outputs(video_path, targets, cancel_event):
+    source = ffmpeg.input(video_path)
+    outputs = [source.output(path, **subtitle_output_args(track_index, codec))
+               for track_index, path, codec in targets]
+    ffmpeg_cmd = ffmpeg.merge_outputs(*outputs).global_args('-loglevel', 'error', '-y').compile()
+    process = popen_hidden(ffmpeg_cmd, stderr=subprocess.DEVNULL)
+    process.stdout.close()
+    while True:
+        try:
+            process.wait(timeout=0.2)
+            break
+        except subprocess.TimeoutExpired:
+            if cancel_event is not None and cancel_event.is_set():
+                process.kill()
+                process.wait()
+                return False
+    return process.returncode == 0
+
+
+def extract_subtitles_as_strings(video_path, tracks, cancel_event=None):
+    """
+    Extract several subtitle tracks in a single pass over the file.
+
+    ffmpeg writes every track to its own file of a temporary directory (one output per
+    0:s:N stream, all fed by the same demuxer) and the contents are read back after it exits.
+
+    :param tracks: [(track_index, codec)], codec as in subtitle_output_args, None converts to SRT
+    :param cancel_event: threading.Event, ffmpeg is killed when it is set
+    :return: {track_index: content}, tracks that came out empty are left out
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='comprevids_') as tmp:
+        targets = [(track_index, os.path.join(tmp, f"track_{track_index}.{COPY_CODECS.get(codec, 'srt')}"), codec)
+                   for track_index, codec in tracks]
+        if not run_multi_extract(video_path, targets, cancel_event):
+            print("Error extracting subtitles, ffmpeg did not finish")
+        for track_index, path, _ in targets:
+            try:
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    content = f.read()
+            except FileNotFoundError:
+                continue
+            if content:
+                results[track_index] = content
+    return results
+
+
+def extract_subtitle_as_string(video_path, track_index=0, codec=None):
     """
     Extract subtitle track as string using ffmpeg without showing a black window.
 
     :param video_path: Input video file path
     :param track_index: Subtitle track index to extract
+    :param codec: codec name of the track (get_subtitle_tracks), ASS/SSA tracks are copied as they are
     :return: Subtitle content as string
     """
     try:
         # Use pipe output to get subtitle content directly
         ffmpeg_cmd = (
             ffmpeg.input(video_path)
-            .output('pipe:', map=f'0:s:{track_index}', format='srt')
+            .output('pipe:', **subtitle_output_args(track_index, codec))
             .compile()
         )
 
-        # Platform-specific settings
-        startupinfo = None
-        creationflags = 0
-
-        if sys.platform == "win32":  # Windows: Hide black console window
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            creationflags = subprocess.CREATE_NO_WINDOW
-        else:  # macOS & Linux: Redirect output to prevent terminal popups
-            creationflags = 0
-
-        process = subprocess.Popen(
-            ffmpeg_cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            startupinfo=startupinfo,
-            creationflags=creationflags
-        )
+        process = popen_hidden(ffmpeg_cmd)
 
         out, _ = process.communicate()
         return out.decode('utf-8')
@@ -214,22 +468,135 @@ def extract_subtitle_as_string(video_path, track_index=0):
         print("Error extracting subtitle:", e)
         return None
 
+
+def popen_hidden(cmd, stderr=subprocess.PIPE):
+    """Popen with stdout piped, without showing a black console window on Windows"""
+    # Platform-specific settings
+    startupinfo = None
+    creationflags = 0
+
+    if sys.platform == "win32":  # Windows: Hide black console window
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        creationflags = subprocess.CREATE_NO_WINDOW
+    else:  # macOS & Linux: Redirect output to prevent terminal popups
+        creationflags = 0
+
+    return subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=stderr,
+        startupinfo=startupinfo,
+        creationflags=creationflags
+    )
+
+
+def kill_on_cancel(process, cancel_event, interval=0.2):
+    """
+    Kill process as soon as cancel_event is set, from a small watcher thread: a reader blocked
+    in read1() while ffmpeg demuxes a long stretch without subtitles would only notice much later.
+    The watcher ends with the process.
+    """
+    def watch():
+        while process.poll() is None:
+            if cancel_event.wait(interval):
+                process.kill()
+                return
+
+    threading.Thread(target=watch, daemon=True).start()
+
+
+def stream_subtitle_captions(video_path, track_index=0, track=None, cancel_event=None, chunk_size=64 * 1024,
+                             codec=None):
+    """
+    Extract a subtitle track and parse it while ffmpeg is still writing it.
+
+    Cues are appended to `track` (a CaptionTrack, complete=False until ffmpeg exits) as soon
+    as they are read from the pipe, so the caller can install the track right away and
+    the first captions show up while the rest of the file is being demuxed.
+
+    :param video_path: Input video file path
+    :param track_index: Subtitle track index to extract
+    :param track: CaptionTrack to fill, a new one is created if None
+    :param cancel_event: threading.Event, ffmpeg is killed when it is set
+    :param codec: codec name of the track, ASS/SSA tracks are stream-copied and parsed natively
+    :return: the filled CaptionTrack
+    """
+    if codec in COPY_CODECS:
+        parser = AssStreamParser(track)
+    else:
+        parser = SubtitleStreamParser(track)
+    ffmpeg_cmd = (
+        ffmpeg.input(video_path)
+        .output('pipe:', **subtitle_output_args(track_index, codec))
+        .global_args('-loglevel', 'error')
+        .compile()
+    )
+    # nobody reads stderr while streaming, don't let it fill up and block ffmpeg
+    process = popen_hidden(ffmpeg_cmd, stderr=subprocess.DEVNULL)
+    if cancel_event is not None:
+        kill_on_cancel(process, cancel_event)
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    try:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            chunk = process.stdout.read1(chunk_size)
+            if not chunk:
+                break
+            parser.feed(decoder.decode(chunk))
+        parser.feed(decoder.decode(b'', final=True))
+    finally:
+        process.stdout.close()
+        process.wait()
+        parser.close()
+    return parser.track
+
+def extract_subtitle_captions(video_path, track_index=0, track=None, cancel_event=None, codec=None):
+    """
+    Load an embedded subtitle track into a CaptionTrack, the fastest way available:
+    text tracks of Matroska/WebM files are read natively (read_mkv_subtitle, only the subtitle
+    blocks are touched), everything else and every file the native reader refuses
+    (PGS/VobSub, laced or encrypted blocks, broken files) is streamed through ffmpeg.
+    """
+    if track is None:
+        track = CaptionTrack()
+    if os.path.splitext(video_path)[1].lower() in MATROSKA_EXTS:
+        try:
+            return read_mkv_subtitle(video_path, track_index, track=track, cancel_event=cancel_event)
+        except Exception as e:
+            print(f"Native subtitle reader failed, using ffmpeg: {str(e)}")
+        if len(track) > 0:
+            # failed half way (a laced or corrupt block), the track is already showing:
+            # let ffmpeg read it all and only add what comes after the last cue
+            rest = stream_subtitle_captions(video_path, track_index=track_index, cancel_event=cancel_event,
+                                            codec=codec)
+            last = track.starts[-1]
+            seqs = [seq for seq in range(len(rest)) if rest.starts[seq] > last]
+            track.extend([rest.starts[seq] for seq in seqs], [rest.ends[seq] for seq in seqs],
+                         [rest.text(seq) for seq in seqs])
+            track.complete = cancel_event is None or not cancel_event.is_set()
+            return track
+    return stream_subtitle_captions(video_path, track_index=track_index, track=track, cancel_event=cancel_event,
+                                    codec=codec)
+
+
 def extract_all_as_strings(video_path):
-    """ Extract all subtitle tracks as strings """
-    tracks = get_subtitle_tracks(video_path)
+    """ Extract all text subtitle tracks as strings, in one ffmpeg pass """
+    tracks = [track for track in get_subtitle_tracks(video_path) if track[1] in TEXT_SUBTITLE_CODECS]
     subtitles = []
     langs = []
 
+    try:
+        print("extracting subtitle indexes=", [track[0] for track in tracks])
+        contents = extract_subtitles_as_strings(video_path, [(track[0], None) for track in tracks])
+    except Exception as e:
+        print("Error extracting subtitle tracks:", e)
+        contents = {}
     for track in tracks:
-        try:
-            t_index = track[0]
-            print("extracting subtitle index=", t_index)
-            subtitle_content = extract_subtitle_as_string(video_path, track_index=t_index)
-            if subtitle_content:
-                subtitles.append(subtitle_content)
-                langs.append(track[2])
-        except Exception as e:
-            print(f"Error extracting subtitle track {track}:", e)
+        if track[0] in contents:
+            subtitles.append(contents[track[0]])
+            langs.append(track[2])
 
     return subtitles, langs
 
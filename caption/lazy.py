@@ -0,0 +1,178 @@
+import mmap
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import accumulate
+
+from .parser import CUE_TAGS, timing_to_ms
+from .track import CaptionTrack, CaptionType
+
+# files bigger than this are memory-mapped instead of read and parsed up front
+LAZY_LOAD_SIZE = 8 * 1024 * 1024
+
+TIMING_RE_BYTES = re.compile(
+    rb'^[ \t]*(?:(\d+):)?(\d{1,2}):(\d{1,2})[,.](\d{1,3})[ \t]*-->[ \t]*'
+    rb'(?:(\d+):)?(\d{1,2}):(\d{1,2})[,.](\d{1,3})[^\n]*(?:\n|$)',
+    re.M
+)
+BLANK_LINE_BYTES = re.compile(rb'\n[ \t\r]*\n')
+
+
+def guess_encoding(head):
+    if head.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    try:
+        # the sample may end in the middle of a character
+        head.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        if e.start >= len(head) - 3:
+            return 'utf-8'
+    return 'gb18030'
+
+
+class MappedCaptionTrack(CaptionTrack):
+    """
+    CaptionTrack over a memory-mapped subtitle file.
+
+    Loading only scans the mapping for timing lines and blank-line boundaries and keeps
+    the byte range of every caption text.  The constructor scans the first
+    FIRST_SCAN_SIZE bytes, scan_all() indexes the rest chunk by chunk (from a background thread) while the
+    track is already playing, so time to first caption does not grow with the file.
+    Texts are decoded when they are first asked for, a window around the requested caption
+    at a time, and kept in a small LRU while the rest of the file stays on disk.
+    """
+    FIRST_SCAN_SIZE = 512 * 1024
+    SCAN_CHUNK_SIZE = 4 * 1024 * 1024
+    WINDOW_BEHIND = 8
+    WINDOW_AHEAD = 56
+    CACHE_SIZE = 1024
+
+    def __init__(self, subtitle_file):
+        super().__init__()
+        self.subtitle_file = subtitle_file
+        self._file = open(subtitle_file, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file can't be mapped
+            self._mm = b''
+        self.encoding = guess_encoding(self._mm[:64 * 1024])
+        self.text_starts = array('q')
+        self.text_ends = array('q')
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # scan() may be called from the loading thread and a background scan at once
+        self._scan_lock = threading.Lock()
+        self._scanned = threading.Event()
+        self._scan_pos = 0
+        self.complete = False
+        self.closed = False
+        self.scan(self.FIRST_SCAN_SIZE)
+        # check if raw text contains auto-generated text: <c> and </c>, only check first 10 raws
+        for seq in range(min(10, len(self))):
+            raw_text = self._decode(seq)
+            if '<c>' in raw_text and '</c>' in raw_text:
+                self.caption_type = CaptionType.YOUTUBE_AUTO_GENERATED
+
+    def scan(self, size=None):
+        """Index the next `size` bytes of the file, everything that is left by default"""
+        with self._scan_lock:
+            self._scan(size)
+
+    def _scan(self, size):
+        mm = self._mm
+        pos = self._scan_pos
+        end = len(mm)
+        if size is not None and pos + size < end:
+            # stop on a blank line so the last caption of the chunk is complete
+            cut = max(mm.rfind(b'\n\n', pos, pos + size), mm.rfind(b'\n\r\n', pos, pos + size))
+            if cut > pos:
+                end = cut
+        matches = list(TIMING_RE_BYTES.finditer(mm, pos, end))
+        stamps = [m.groups() for m in matches]
+        text_ends = []
+        for i, m in enumerate(matches):
+            limit = matches[i + 1].start() if i + 1 < len(matches) else end
+            blank = BLANK_LINE_BYTES.search(mm, m.end() - 1, limit)
+            text_ends.append(blank.start() if blank else limit)
+        self.starts.extend([timing_to_ms(h, m, s, f) for h, m, s, f, _, _, _, _ in stamps])
+        self.ends.extend([timing_to_ms(h, m, s, f) for _, _, _, _, h, m, s, f in stamps])
+        self.text_starts.extend([m.end() for m in matches])
+        # text_ends goes last, len() only counts complete captions
+        self.text_ends.extend(text_ends)
+        self._scan_pos = end
+        if end >= len(mm):
+            self.complete = True
+            self._scanned.set()
+
+    def scan_all(self):
+        while not self.complete:
+            self.scan(self.SCAN_CHUNK_SIZE)
+
+    def wait_complete(self, timeout=None):
+        """Block until another thread's scan_all() has indexed the whole file"""
+        return self._scanned.wait(timeout)
+
+    def _decode(self, seq):
+        raw = self._mm[self.text_starts[seq]:self.text_ends[seq]]
+        return raw.decode(self.encoding, 'replace').replace('\r', '').strip('\n')
+
+    def _load_window(self, seq):
+        lo = max(0, seq - self.WINDOW_BEHIND)
+        hi = min(len(self), seq + self.WINDOW_AHEAD)
+        cache = self._cache
+        for i in range(lo, hi):
+            if i not in cache:
+                text = self._decode(i)
+                cache[i] = CUE_TAGS.sub('', text) if '<' in text else text
+        while len(cache) > self.CACHE_SIZE:
+            cache.popitem(last=False)
+
+    def append(self, start, end, text):
+        raise TypeError("MappedCaptionTrack is read-only")
+
+    def extend(self, starts, ends, texts):
+        raise TypeError("MappedCaptionTrack is read-only")
+
+    def raw_text(self, seq):
+        return self._decode(seq)
+
+    def text(self, seq):
+        with self._lock:
+            text = self._cache.get(seq)
+            if text is None:
+                self._load_window(seq)
+                text = self._cache[seq]
+            self._cache.move_to_end(seq)
+            return text
+
+    def columns(self):
+        """Decode the whole track into flat buffers (for the caption cache)"""
+        texts = []
+        for seq in range(len(self)):
+            text = self._decode(seq)
+            texts.append(CUE_TAGS.sub('', text) if '<' in text else text)
+        if self.closed:
+            # the texts decoded after close() are empty, don't let them reach the cache
+            raise ValueError("caption track is closed")
+        offsets = array('i', accumulate(map(len, texts), initial=0))
+        return self.starts, self.ends, offsets, ''.join(texts)
+
+    def close(self):
+        """
+        Unmap the file and close it, once the running scan or window decode is done.
+        Workers still reading the track afterwards get empty texts and a complete track.
+        """
+        with self._scan_lock, self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            mm, self._mm = self._mm, b''
+            if isinstance(mm, mmap.mmap):
+                mm.close()
+            self._file.close()
+
+    def __len__(self):
+        return len(self.text_ends)
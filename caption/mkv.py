@@ -0,0 +1,612 @@
+import mmap
+import os
+import struct
+import time
+import zlib
+
+from .ass import ASS_DRAWING, ass_text
+from .parser import CUE_TAGS
+from .track import CaptionTrack
+
+# EBML / Matroska element ids, see https://www.matroska.org/technical/elements.html
+EBML = 0x1A45DFA3
+DOC_TYPE = 0x4282
+SEGMENT = 0x18538067
+SEEK_HEAD = 0x114D9B74
+SEEK = 0x4DBB
+SEEK_ID = 0x53AB
+SEEK_POSITION = 0x53AC
+INFO = 0x1549A966
+TIMECODE_SCALE = 0x2AD7B1
+SEGMENT_DURATION = 0x4489
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_NUMBER = 0xD7
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+LANGUAGE = 0x22B59C
+LANGUAGE_IETF = 0x22B59D
+NAME = 0x536E
+FLAG_DEFAULT = 0x88
+FLAG_FORCED = 0x55AA
+DEFAULT_DURATION = 0x23E383
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+CONTENT_ENCODINGS = 0x6D80
+CONTENT_ENCODING = 0x6240
+CONTENT_ENCODING_TYPE = 0x5033
+CONTENT_COMPRESSION = 0x5034
+CONTENT_COMP_ALGO = 0x4254
+CONTENT_COMP_SETTINGS = 0x4255
+CUES = 0x1C53BB6B
+CUE_POINT = 0xBB
+CUE_TRACK_POSITIONS = 0xB7
+CUE_TRACK = 0xF7
+CUE_CLUSTER_POSITION = 0xF1
+CUE_RELATIVE_POSITION = 0xF0
+CLUSTER = 0x1F43B675
+CLUSTER_TIMECODE = 0xE7
+SIMPLE_BLOCK = 0xA3
+BLOCK_GROUP = 0xA0
+BLOCK = 0xA1
+BLOCK_DURATION = 0x9B
+
+TRACK_TYPE_VIDEO = 0x01
+TRACK_TYPE_AUDIO = 0x02
+TRACK_TYPE_SUBTITLE = 0x11
+# CodecID -> the codec_name ffprobe reports, so both listings can be used the same way
+CODEC_NAMES = {'S_TEXT/UTF8': 'subrip', 'S_TEXT/ASCII': 'text', 'S_TEXT/ASS': 'ass', 'S_TEXT/SSA': 'ssa',
+               'S_TEXT/WEBVTT': 'webvtt', 'S_HDMV/PGS': 'hdmv_pgs_subtitle', 'S_VOBSUB': 'dvd_subtitle',
+               'S_DVBSUB': 'dvb_subtitle', 'S_HDMV/TEXTST': 'hdmv_text_subtitle', 'S_KATE': 'kate'}
+# the Tracks element sits within the first few KB in practice, this leaves room for big CodecPrivate
+HEAD_BYTES = 256 * 1024
+# CodecID -> how the block payload becomes caption text
+TEXT_CODECS = {'S_TEXT/UTF8': 'srt', 'S_TEXT/ASCII': 'srt', 'S_TEXT/WEBVTT': 'vtt',
+               'S_TEXT/ASS': 'ass', 'S_TEXT/SSA': 'ass'}
+# shown until the next caption when a block carries no duration
+DEFAULT_CUE_MS = 3000
+# longest wait before the cues read so far are added to the track
+FLUSH_SECONDS = 0.05
+
+
+def read_id(buf, pos):
+    """Element id at pos (marker bit kept, as ids are written in the spec), next position"""
+    first = buf[pos]
+    length = 9 - first.bit_length()
+    if not 1 <= length <= 4:
+        raise ValueError(f"bad EBML id at {pos}")
+    return int.from_bytes(buf[pos:pos + length], 'big'), pos + length
+
+
+def read_vint(buf, pos):
+    """Variable size integer at pos, None for the reserved "unknown size", next position"""
+    first = buf[pos]
+    length = 9 - first.bit_length()
+    if not 1 <= length <= 8:
+        raise ValueError(f"bad EBML size at {pos}")
+    value = first & (0xFF >> length)
+    for b in buf[pos + 1:pos + length]:
+        value = (value << 8) | b
+    if value == (1 << (7 * length)) - 1:
+        value = None
+    return value, pos + length
+
+
+def read_element(buf, pos):
+    """(id, size, data position) of the element at pos"""
+    element_id, pos = read_id(buf, pos)
+    size, pos = read_vint(buf, pos)
+    return element_id, size, pos
+
+
+def children(buf, pos, end):
+    """(id, size, data position) of the elements in buf[pos:end], an unknown size runs to end"""
+    while pos < end:
+        element_id, size, data = read_element(buf, pos)
+        if size is None:
+            size = end - data
+        yield element_id, size, data
+        pos = data + size
+
+
+def read_uint(buf, pos, size):
+    return int.from_bytes(buf[pos:pos + size], 'big')
+
+
+def read_float(buf, pos, size):
+    if size == 4:
+        return struct.unpack('>f', buf[pos:pos + 4])[0]
+    if size == 8:
+        return struct.unpack('>d', buf[pos:pos + 8])[0]
+    return 0.0
+
+
+def read_string(buf, pos, size):
+    return bytes(buf[pos:pos + size]).rstrip(b'\0').decode('utf-8', 'replace')
+
+
+def parse_tracks(buf, pos, end):
+    """TrackEntry elements of a Tracks element as dicts, in file order"""
+    tracks = []
+    for element_id, size, data in children(buf, pos, end):
+        if element_id != TRACK_ENTRY:
+            continue
+        track = {'number': 0, 'type': 0, 'codec': '', 'language': 'eng', 'name': '', 'default': True,
+                 'forced': False, 'default_duration': 0, 'encodings': []}
+        for child_id, child_size, child in children(buf, data, data + size):
+            if child_id == TRACK_NUMBER:
+                track['number'] = read_uint(buf, child, child_size)
+            elif child_id == TRACK_TYPE:
+                track['type'] = read_uint(buf, child, child_size)
+            elif child_id == CODEC_ID:
+                track['codec'] = read_string(buf, child, child_size)
+            elif child_id == LANGUAGE:
+                track['language'] = read_string(buf, child, child_size)
+            elif child_id == LANGUAGE_IETF:
+                track['language_ietf'] = read_string(buf, child, child_size)
+            elif child_id == NAME:
+                track['name'] = read_string(buf, child, child_size)
+            elif child_id == FLAG_DEFAULT:
+                track['default'] = bool(read_uint(buf, child, child_size))
+            elif child_id == FLAG_FORCED:
+                track['forced'] = bool(read_uint(buf, child, child_size))
+            elif child_id == DEFAULT_DURATION:
+                track['default_duration'] = read_uint(buf, child, child_size)
+            elif child_id == CONTENT_ENCODINGS:
+                track['encodings'] = parse_encodings(buf, child, child + child_size)
+            elif child_id == VIDEO:
+                for video_id, video_size, video in children(buf, child, child + child_size):
+                    if video_id == PIXEL_WIDTH:
+                        track['width'] = read_uint(buf, video, video_size)
+                    elif video_id == PIXEL_HEIGHT:
+                        track['height'] = read_uint(buf, video, video_size)
+        tracks.append(track)
+    return tracks
+
+
+def parse_encodings(buf, pos, end):
+    """[(type, algo, settings)] of ContentEncodings, type 0 is compression, 1 encryption"""
+    encodings = []
+    for element_id, size, data in children(buf, pos, end):
+        if element_id != CONTENT_ENCODING:
+            continue
+        encoding_type, algo, settings = 0, 0, b''
+        for child_id, child_size, child in children(buf, data, data + size):
+            if child_id == CONTENT_ENCODING_TYPE:
+                encoding_type = read_uint(buf, child, child_size)
+            elif child_id == CONTENT_COMPRESSION:
+                for comp_id, comp_size, comp in children(buf, child, child + child_size):
+                    if comp_id == CONTENT_COMP_ALGO:
+                        algo = read_uint(buf, comp, comp_size)
+                    elif comp_id == CONTENT_COMP_SETTINGS:
+                        settings = bytes(buf[comp:comp + comp_size])
+        encodings.append((encoding_type, algo, settings))
+    return encodings
+
+
+def decode_payload(payload, encodings):
+    # zlib (0) and header stripping (3) are what mkvmerge uses for text tracks
+    for encoding_type, algo, settings in reversed(encodings):
+        if encoding_type != 0:
+            raise ValueError("encrypted subtitle track")
+        if algo == 0:
+            payload = zlib.decompress(payload)
+        elif algo == 3:
+            payload = settings + payload
+        else:
+            raise ValueError(f"unsupported compression {algo}")
+    return payload
+
+
+def payload_text(payload, kind):
+    """Caption text of a block, None for blocks that show nothing (ASS drawings, empty lines)"""
+    text = payload.decode('utf-8', 'replace').replace('\r\n', '\n').replace('\r', '\n')
+    if kind == 'ass':
+        # ReadOrder, Layer, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+        fields = text.split(',', 8)
+        if len(fields) != 9 or ASS_DRAWING.search(fields[8]):
+            return None
+        text = ass_text(fields[8])
+    elif '<' in text:
+        text = CUE_TAGS.sub('', text)
+    text = text.strip('\n')
+    return text or None
+
+
+def _load(buf, pos, read_at):
+    """(id, buffer, data, end) of the element at pos, read from the file when buf stops before its end"""
+    try:
+        element_id, size, data = read_element(buf, pos)
+    except IndexError:
+        element_id = size = None
+        data = len(buf)
+    end = len(buf) if size is None and element_id is not None else data + (size or 0)
+    if element_id is not None and end <= len(buf):
+        return element_id, buf, data, end
+    if read_at is None:
+        raise ValueError(f"truncated element at {pos}")
+    # 12 bytes hold any id and size
+    element_id, size, data = read_element(read_at(pos, 12), 0)
+    if size is None:
+        raise ValueError(f"unknown size element at {pos}")
+    chunk = read_at(pos, data + size)
+    if len(chunk) < data + size:
+        raise ValueError(f"truncated element at {pos}")
+    return element_id, chunk, data, data + size
+
+
+def parse_head(buf, read_at=None, file_size=None):
+    """
+    The head of a Matroska file: EBML header, Segment position, the top-level elements
+    in front of the first Cluster (or pointed at by the SeekHead) and the Info and Tracks.
+
+    buf is the whole file (mmap) or only its first bytes, read_at(pos, size) then fetches
+    the Info/Tracks/SeekHead that do not fit.  Returns a dict with segment_start,
+    segment_end, first_cluster, positions ({element id: file offset}), timecode_scale,
+    duration (ms, 0 if unknown) and tracks (parse_tracks).
+    """
+    if file_size is None:
+        file_size = len(buf)
+    element_id, size, data = read_element(buf, 0)
+    if element_id != EBML:
+        raise ValueError("not an EBML file")
+    for child_id, child_size, child in children(buf, data, data + size):
+        if child_id == DOC_TYPE and read_string(buf, child, child_size) not in ('matroska', 'webm'):
+            raise ValueError("not a Matroska file")
+    element_id, size, data = read_element(buf, data + size)
+    if element_id != SEGMENT:
+        raise ValueError("no Matroska segment")
+    head = {'segment_start': data, 'segment_end': file_size if size is None else min(file_size, data + size),
+            'first_cluster': None, 'positions': {}, 'timecode_scale': 1000000, 'duration': 0, 'tracks': []}
+    positions = head['positions']
+
+    pos = head['segment_start']
+    while pos < head['segment_end']:
+        if pos + 12 > len(buf) and read_at is not None:
+            # past what was read, one small read per top-level element until the first cluster
+            element_id, size, data = read_element(read_at(pos, 12), 0)
+            data += pos
+        else:
+            element_id, size, data = read_element(buf, pos)
+        if element_id == CLUSTER:
+            head['first_cluster'] = pos
+            break
+        positions.setdefault(element_id, pos)
+        if size is None:
+            break
+        if element_id == SEEK_HEAD:
+            _, seek_buf, seek_data, seek_end = _load(buf, pos, read_at)
+            for seek_id, seek_pos in parse_seek_head(seek_buf, seek_data, seek_end, head['segment_start']):
+                if seek_pos < file_size:
+                    positions.setdefault(seek_id, seek_pos)
+        pos = data + size
+
+    # Cues (and sometimes Tracks) are written after the clusters, the SeekHead points there
+    if INFO in positions:
+        _, info_buf, data, end = _load(buf, positions[INFO], read_at)
+        duration = 0.0
+        for child_id, child_size, child in children(info_buf, data, end):
+            if child_id == TIMECODE_SCALE:
+                head['timecode_scale'] = read_uint(info_buf, child, child_size)
+            elif child_id == SEGMENT_DURATION:
+                duration = read_float(info_buf, child, child_size)
+        head['duration'] = int(duration * head['timecode_scale'] / 1000000)
+    if TRACKS in positions:
+        _, tracks_buf, data, end = _load(buf, positions[TRACKS], read_at)
+        head['tracks'] = parse_tracks(tracks_buf, data, end)
+    return head
+
+
+def parse_seek_head(buf, pos, end, segment_start):
+    """(element id, file offset) of the Seek entries of a SeekHead"""
+    for element_id, size, data in children(buf, pos, end):
+        if element_id != SEEK:
+            continue
+        seek_id = seek_pos = None
+        for child_id, child_size, child in children(buf, data, data + size):
+            if child_id == SEEK_ID:
+                seek_id = read_uint(buf, child, child_size)
+            elif child_id == SEEK_POSITION:
+                seek_pos = segment_start + read_uint(buf, child, child_size)
+        if seek_id is not None and seek_pos is not None:
+            yield seek_id, seek_pos
+
+
+def read_mkv_head(path, head_bytes=HEAD_BYTES):
+    """
+    parse_head from the first head_bytes of a file, plain reads and no mmap: listing the
+    tracks of a 4GB file costs one small read (two or three when the SeekHead points past it).
+    """
+    with open(path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        buf = f.read(head_bytes)
+
+        def read_at(pos, size):
+            f.seek(pos)
+            return f.read(size)
+
+        return parse_head(buf, read_at, file_size)
+
+
+class MatroskaFile:
+    """
+    Memory-mapped Matroska/WebM file, read without ffmpeg.
+
+    Only the elements that lead to subtitle packets are touched: the SeekHead, Info and
+    Tracks at the head of the Segment, then the Cues index, which tells where the first
+    subtitle block is.  From there the clusters are walked from element header to element
+    header, which skips video and audio frames by their size without reading them.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self.buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        try:
+            head = parse_head(self.buf)
+        except Exception:
+            self.close()
+            raise
+        self.timecode_scale = head['timecode_scale']
+        self.tracks = head['tracks']
+        self.segment_start = head['segment_start']
+        self.segment_end = head['segment_end']
+        self.first_cluster = head['first_cluster']
+        self._positions = head['positions']
+
+    def close(self):
+        self.buf.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def subtitle_tracks(self):
+        """Subtitle TrackEntry dicts in file order, the n-th one is ffmpeg's 0:s:n"""
+        return [track for track in self.tracks if track['type'] == TRACK_TYPE_SUBTITLE]
+
+    def cue_positions(self, numbers):
+        """
+        {track number: [(cluster position, block position or None)]} from the Cues,
+        positions are absolute file offsets.
+        """
+        buf = self.buf
+        found = {number: [] for number in numbers}
+        if CUES not in self._positions:
+            return found
+        _, size, data = read_element(buf, self._positions[CUES])
+        for element_id, point_size, point in children(buf, data, data + size):
+            if element_id != CUE_POINT:
+                continue
+            for child_id, child_size, child in children(buf, point, point + point_size):
+                if child_id != CUE_TRACK_POSITIONS:
+                    continue
+                number = cluster = relative = None
+                for pos_id, pos_size, pos_data in children(buf, child, child + child_size):
+                    if pos_id == CUE_TRACK:
+                        number = read_uint(buf, pos_data, pos_size)
+                    elif pos_id == CUE_CLUSTER_POSITION:
+                        cluster = self.segment_start + read_uint(buf, pos_data, pos_size)
+                    elif pos_id == CUE_RELATIVE_POSITION:
+                        relative = read_uint(buf, pos_data, pos_size)
+                if number in found and cluster is not None:
+                    found[number].append((cluster, relative))
+        return found
+
+    def _cluster_timecode(self, cluster):
+        element_id, size, data = read_element(self.buf, cluster)
+        if element_id != CLUSTER:
+            raise ValueError(f"no cluster at {cluster}")
+        end = self.segment_end if size is None else data + size
+        for child_id, child_size, child in children(self.buf, data, end):
+            if child_id == CLUSTER_TIMECODE:
+                return read_uint(self.buf, child, child_size), data, end
+        raise ValueError(f"cluster without timecode at {cluster}")
+
+    def _block(self, pos, size, numbers):
+        """(track number, relative timecode, payload) of a Block/SimpleBlock body, None for other tracks"""
+        buf = self.buf
+        number, p = read_vint(buf, pos)
+        if number not in numbers:
+            return None
+        relative = int.from_bytes(buf[p:p + 2], 'big', signed=True)
+        if buf[p + 2] & 0x06:
+            raise ValueError("laced subtitle blocks are not supported")
+        return number, relative, bytes(buf[p + 3:pos + size])
+
+    def _blocks_in(self, pos, end, numbers):
+        """(number, relative timecode, duration or None, payload) of the wanted blocks in [pos, end)"""
+        buf = self.buf
+        for element_id, size, data in children(buf, pos, end):
+            if element_id == SIMPLE_BLOCK:
+                block = self._block(data, size, numbers)
+                if block is not None:
+                    yield block[0], block[1], None, block[2]
+            elif element_id == BLOCK_GROUP:
+                block, duration = None, None
+                for child_id, child_size, child in children(buf, data, data + size):
+                    if child_id == BLOCK:
+                        block = self._block(child, child_size, numbers)
+                        if block is None:
+                            break
+                    elif child_id == BLOCK_DURATION:
+                        duration = read_uint(buf, child, child_size)
+                if block is not None:
+                    yield block[0], block[1], duration, block[2]
+            elif element_id == CLUSTER:
+                # a cluster of unknown size ends where the next one starts
+                return
+
+    def _clusters(self, pos=None):
+        """Absolute positions of every cluster from pos (the first one by default), walking the segment by element sizes"""
+        buf = self.buf
+        if pos is None:
+            pos = self.first_cluster
+        while pos is not None and pos < self.segment_end:
+            element_id, size, data = read_element(buf, pos)
+            if element_id == CLUSTER:
+                yield pos
+                if size is None:
+                    # unknown size, skip over its children
+                    end = data
+                    for child_id, child_size, child in children(buf, data, self.segment_end):
+                        if child_id == CLUSTER:
+                            break
+                        end = child + child_size
+                    pos = end
+                    continue
+            pos = data + (size if size is not None else 0)
+
+    def read_blocks(self, numbers, cancel_event=None):
+        """
+        Yield (track number, start ms, duration ms or None, payload) of the blocks of the given tracks.
+
+        The Cues are only a seek hint: muxers are free to index some subtitle blocks and not
+        others, so every cluster from the first cued one on is walked.  Clusters in front of
+        it are skipped, which is most of the file for a track that starts late.
+        """
+        numbers = set(numbers)
+        tracks = {track['number']: track for track in self.tracks}
+        scale = self.timecode_scale
+        cued = [cluster for positions in self.cue_positions(numbers).values() for cluster, _ in positions]
+        start = min(cued) if cued else None
+        if start is not None and (start >= self.segment_end or read_element(self.buf, start)[0] != CLUSTER):
+            # a broken cue, don't walk from the middle of something else
+            start = None
+        # no cue for these tracks, walk from the first cluster
+        for cluster in self._clusters(start):
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            timecode, data, end = self._cluster_timecode(cluster)
+            for number, rel, duration, payload in self._blocks_in(data, end, numbers):
+                yield self._timed(number, timecode + rel, duration, payload, tracks, scale)
+
+    @staticmethod
+    def _timed(number, timecode, duration, payload, tracks, scale):
+        track = tracks[number]
+        start = timecode * scale // 1000000
+        if duration is not None:
+            duration = duration * scale // 1000000
+        elif track['default_duration']:
+            duration = track['default_duration'] // 1000000
+        return number, start, duration, decode_payload(payload, track['encodings'])
+
+
+def _event_end(start, duration, next_start):
+    if duration is not None:
+        return start + duration
+    if next_start is None or next_start <= start:
+        return start + DEFAULT_CUE_MS
+    return min(next_start, start + DEFAULT_CUE_MS)
+
+
+def _subtitle_kind(subtitles, sub_index):
+    """(TrackEntry, 'srt'/'vtt'/'ass') of the sub_index-th subtitle track, ValueError if it can't be read natively"""
+    if not 0 <= sub_index < len(subtitles):
+        raise ValueError(f"no subtitle track {sub_index}")
+    entry = subtitles[sub_index]
+    kind = TEXT_CODECS.get(entry['codec'])
+    if kind is None:
+        raise ValueError(f"unsupported subtitle codec {entry['codec']}")
+    for encoding_type, algo, _ in entry['encodings']:
+        if encoding_type != 0 or algo not in (0, 3):
+            raise ValueError("unsupported subtitle encoding")
+    return entry, kind
+
+
+class _SubtitleReader:
+    """Events of one subtitle track on their way into its CaptionTrack"""
+
+    def __init__(self, track, kind):
+        self.track = track
+        self.kind = kind
+        self.batch = []
+        self.held = None
+        self.last = None
+
+    def add(self, start, duration, payload):
+        text = payload_text(payload, self.kind)
+        if text is None:
+            return
+        held = self.held
+        if held is not None:
+            self.batch.append((held[0], _event_end(held[0], held[1], start), held[2]))
+        self.held = (start, duration, text)
+
+    def flush(self, final=False):
+        if final and self.held is not None:
+            held = self.held
+            self.batch.append((held[0], _event_end(held[0], held[1], None), held[2]))
+            self.held = None
+        self.batch.sort(key=lambda event: event[0])
+        starts, ends, texts = [], [], []
+        for event in self.batch:
+            # typesetters stack the same line on several layers
+            if event == self.last:
+                continue
+            self.last = event
+            starts.append(event[0])
+            ends.append(event[1])
+            texts.append(event[2])
+        self.track.extend(starts, ends, texts)
+        self.batch.clear()
+
+
+def read_mkv_subtitles(video_path, tracks, cancel_event=None, skip_unsupported=False):
+    """
+    Read several subtitle tracks of a Matroska/WebM file in one pass over the clusters.
+    :param tracks: {sub index (ffmpeg's 0:s:n): CaptionTrack to fill}
+    :param skip_unsupported: leave the tracks read_mkv_subtitle would refuse alone instead of
+        raising ValueError (before anything is added)
+    :return: the sub indexes that were read
+    """
+    with MatroskaFile(video_path) as mkv:
+        subtitles = mkv.subtitle_tracks()
+        readers = {}
+        for sub_index, track in tracks.items():
+            try:
+                entry, kind = _subtitle_kind(subtitles, sub_index)
+            except ValueError:
+                if not skip_unsupported:
+                    raise
+                continue
+            readers[entry['number']] = (sub_index, _SubtitleReader(track, kind))
+        for _, reader in readers.values():
+            reader.track.complete = False
+        flushed = time.monotonic()
+        for number, start, duration, payload in mkv.read_blocks(readers, cancel_event):
+            readers[number][1].add(start, duration, payload)
+            if time.monotonic() - flushed >= FLUSH_SECONDS:
+                for _, reader in readers.values():
+                    reader.flush()
+                flushed = time.monotonic()
+        cancelled = cancel_event is not None and cancel_event.is_set()
+        for _, reader in readers.values():
+            reader.flush(final=True)
+            # a cancelled read stays incomplete, nothing may take it for the whole track
+            reader.track.complete = not cancelled
+    return [sub_index for sub_index, _ in readers.values()]
+
+
+def read_mkv_subtitle(video_path, sub_index=0, track=None, cancel_event=None):
+    """
+    Read the sub_index-th subtitle track (ffmpeg's 0:s:sub_index) of a Matroska/WebM file
+    into a CaptionTrack without ffmpeg.  Raises ValueError for codecs other than SRT, ASS/SSA
+    and WebVTT (PGS, VobSub, ...) and unsupported encodings before anything is added, so the
+    caller can fall back to ffmpeg.
+
+    Blocks come in cluster (time) order, cues are added to the track as they are read, at
+    most FLUSH_SECONDS apart, so an installed track shows its first captions right away.
+    One event is held back until the next one is read, a block without duration ends there.
+    """
+    if track is None:
+        track = CaptionTrack()
+    read_mkv_subtitles(video_path, {sub_index: track}, cancel_event)
+    return track
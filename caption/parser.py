@@ -0,0 +1,122 @@
+import re
+
+from .track import CaptionTrack, CaptionType
+
+# one timing line, SRT (00:00:01,000) or WebVTT (00:01.000 / 00:00:01.000), cue settings ignored
+TIMING_RE = re.compile(
+    r'^[ \t]*(?:(\d+):)?(\d{1,2}):(\d{1,2})[,.](\d{1,3})[ \t]*-->[ \t]*'
+    r'(?:(\d+):)?(\d{1,2}):(\d{1,2})[,.](\d{1,3})[^\n]*(?:\n|$)',
+    re.M
+)
+CUE_TAGS = re.compile(r'<[^>]*>')
+
+ENCODINGS = ['utf-8-sig', 'gb18030', 'latin1']
+
+
+def read_subtitle_file(subtitle_file):
+    """Read a subtitle file as text, guessing the encoding the way LemmaDB.load does"""
+    with open(subtitle_file, 'rb') as f:
+        content = f.read()
+    for encoding in ENCODINGS:
+        try:
+            return content.decode(encoding)
+        except UnicodeDecodeError:
+            pass
+    return content.decode('utf-8', 'ignore')
+
+
+def timing_to_ms(h, m, s, f):
+    """Groups of a timing match (str or bytes) to milliseconds, '1.5' means 1500ms"""
+    ms = int(f)
+    if len(f) < 3:
+        ms *= 10 ** (3 - len(f))
+    return ((int(h) if h else 0) * 3600 + int(m) * 60 + int(s)) * 1000 + ms
+
+
+def parse_timings(buf, pos=0, end=None):
+    """
+    Parse every cue of an SRT/WebVTT buffer in one regex pass.
+    :return: (starts, ends, raw_texts) with times in milliseconds
+    """
+    if end is None:
+        end = len(buf)
+    matches = list(TIMING_RE.finditer(buf, pos, end))
+    stamps = [m.groups() for m in matches]
+    starts = [timing_to_ms(h, m, s, f) for h, m, s, f, _, _, _, _ in stamps]
+    ends = [timing_to_ms(h, m, s, f) for _, _, _, _, h, m, s, f in stamps]
+    texts = []
+    for i, m in enumerate(matches):
+        limit = matches[i + 1].start() if i + 1 < len(matches) else end
+        stop = buf.find('\n\n', m.end() - 1, limit)
+        if stop != -1:
+            texts.append(buf[m.end():stop].strip('\n'))
+            continue
+        text = buf[m.end():limit].strip('\n')
+        if i + 1 < len(matches):
+            # no blank line before the next cue, don't swallow its SRT counter
+            head, _, last = text.rpartition('\n')
+            if last.strip().isdigit():
+                text = head
+        texts.append(text)
+    return starts, ends, texts
+
+
+def parse_subtitle_string(buf, track=None):
+    """
+    Parse SRT or WebVTT text straight into a CaptionTrack, no temp files and no per-cue objects.
+    Headers, NOTE/STYLE blocks and cue identifiers carry no timing line and are skipped.
+    YouTube auto-generated captions are recognised from the <c> tags of the first cues.
+    """
+    if track is None:
+        track = CaptionTrack()
+    buf = buf.replace('\r\n', '\n').replace('\r', '\n')
+    starts, ends, texts = parse_timings(buf)
+    # check if raw text contains auto-generated text: <c> and </c>, only check first 10 raws
+    for raw_text in texts[:10]:
+        if '<c>' in raw_text and '</c>' in raw_text:
+            track.caption_type = CaptionType.YOUTUBE_AUTO_GENERATED
+    if track.caption_type == CaptionType.YOUTUBE_AUTO_GENERATED and (track.raw_texts is not None or len(track) == 0):
+        # normalize_rollup reads the word timings from the tagged text
+        if track.raw_texts is None:
+            track.raw_texts = []
+        track.raw_texts.extend(texts)
+    texts = [CUE_TAGS.sub('', t) if '<' in t else t for t in texts]
+    track.extend(starts, ends, texts)
+    return track
+
+
+class SubtitleStreamParser:
+    """
+    Incremental SRT/WebVTT parser for text that arrives in chunks (e.g. an ffmpeg pipe).
+    Everything up to the last blank line is complete and goes straight into the track,
+    only the unfinished tail is kept for the next feed().
+    """
+
+    def __init__(self, track=None):
+        if track is None:
+            track = CaptionTrack()
+        self.track = track
+        self.track.complete = False
+        self._buf = ''
+
+    def feed(self, text):
+        """Parse the complete cues of text, return how many were added"""
+        buf = (self._buf + text).replace('\r\n', '\n')
+        cut = buf.rfind('\n\n')
+        if cut == -1:
+            self._buf = buf
+            return 0
+        self._buf = buf[cut:]
+        count = len(self.track)
+        parse_subtitle_string(buf[:cut], self.track)
+        return len(self.track) - count
+
+    def close(self):
+        parse_subtitle_string(self._buf, self.track)
+        self._buf = ''
+        self.track.complete = True
+        return self.track
+
+
+def parse_subtitle_file(subtitle_file, track=None):
+    return parse_subtitle_string(read_subtitle_file(subtitle_file), track)
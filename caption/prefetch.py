@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+
+from .stardict import render_dictionary_entry
+from .tokens import WORD_RE
+
+# keys per query_batch statement, below SQLite's host parameter limit
+BATCH_KEYS = 500
+
+
+class DictionaryPrefetcher:
+    """
+    Looks up the words of the cues ahead of the playback position before anyone clicks.
+
+    prefetch(seq) collects the distinct words of the next AHEAD cues, resolves the ones
+    not cached yet (and their lemmas) with one StarDict.query_batch, renders their entries
+    and keeps the HTML in an LRU of max_entries words.  get() is a dict hit for the GUI
+    thread, a word that was never prefetched still goes through the normal lookup worker.
+    """
+    AHEAD = 20
+
+    def __init__(self, translator, max_entries=2048):
+        self.translator = translator
+        self.max_entries = max_entries
+        self._html = OrderedDict()
+        self._lock = threading.Lock()
+        self._busy = False
+        # cue range already handed to a prefetch, [captions id, lo, hi)
+        self._window = (None, 0, 0)
+
+    def get(self, word):
+        """Rendered entry of a word, None if it is not prefetched"""
+        key = word.strip().lower()
+        with self._lock:
+            html = self._html.get(key)
+            if html is not None:
+                self._html.move_to_end(key)
+            return html
+
+    def claim(self, captions, seq):
+        """
+        Called from the GUI thread on every caption change: True (and the window is taken)
+        when playback at seq is past the middle of the last prefetched window and no
+        prefetch is running, the caller then runs prefetch() in a worker.
+        """
+        if self._busy or getattr(self.translator, 'star_dict', None) is None:
+            return False
+        captions_id, lo, hi = self._window
+        if captions_id == id(captions) and lo <= seq < hi - self.AHEAD // 2:
+            return False
+        self._busy = True
+        self._window = (id(captions), seq, min(len(captions), seq + self.AHEAD))
+        return True
+
+    def _words(self, captions, tokens, lo, hi):
+        words = {}
+        for seq in range(lo, hi):
+            if tokens is not None and tokens.indexed(seq):
+                text = captions[seq]['caption'].text
+                for start, end, lemma in tokens.tokens(seq):
+                    words[text[start:end].lower()] = lemma
+            else:
+                for m in WORD_RE.finditer(captions[seq]['caption'].text):
+                    word = m.group().lower()
+                    words[word] = tokens.lemma_of(word) if tokens is not None else word
+        return words
+
+    def prefetch(self, captions, seq, tokens=None):
+        """
+        Resolve and render the words of cues [seq, seq + AHEAD), run it in a worker after claim().
+        :param tokens: TrackTokens of the track, for the lemmas
+        :return: number of words added to the cache
+        """
+        star_dict = getattr(self.translator, 'star_dict', None)
+        try:
+            if star_dict is None:
+                return 0
+            lo = max(0, seq)
+            hi = min(len(captions), lo + self.AHEAD)
+            words = self._words(captions, tokens, lo, hi)
+            with self._lock:
+                missing = {word: lemma for word, lemma in words.items() if word not in self._html}
+            if not missing:
+                return 0
+            keys = list(set(missing) | set(missing.values()))
+            entries = {}
+            for i in range(0, len(keys), BATCH_KEYS):
+                batch = keys[i:i + BATCH_KEYS]
+                entries.update(zip(batch, star_dict.query_batch(batch)))
+            rendered = []
+            for word, lemma in missing.items():
+                entry = entries.get(word) or entries.get(lemma)
+                rendered.append((word, render_dictionary_entry(entry)))
+            with self._lock:
+                for word, html in rendered:
+                    self._html[word] = html
+                    self._html.move_to_end(word)
+                while len(self._html) > self.max_entries:
+                    self._html.popitem(last=False)
+            return len(rendered)
+        except Exception as e:
+            print(f"Error prefetching dictionary entries: {str(e)}")
+            return 0
+        finally:
+            self._busy = False
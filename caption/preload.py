@@ -0,0 +1,140 @@
+import os
+import threading
+
+from .ass import parse_ass_string
+from .extract import COPY_CODECS, MATROSKA_EXTS, TEXT_SUBTITLE_CODECS, extract_subtitles_as_strings
+from .mkv import read_mkv_subtitles
+from .parser import parse_subtitle_string
+from .track import CaptionTrack
+
+# languages tried first, the one being learnt and then the native one for bilingual captions
+PRELOAD_LANGUAGES = ('eng', 'en', 'en-us', 'en-gb', 'chi', 'zho', 'zh', 'zh-cn', 'zh-hans')
+
+
+def rank_tracks(tracks, languages=PRELOAD_LANGUAGES):
+    """Text tracks of get_subtitle_tracks, preferred languages first, file order otherwise"""
+    def key(track):
+        language = (track[2] or '').lower()
+        return languages.index(language) if language in languages else len(languages), track[0]
+    return sorted((track for track in tracks if track[1] in TEXT_SUBTITLE_CODECS), key=key)
+
+
+class SubtitlePreloader:
+    """
+    Extracts the likely embedded subtitle tracks of a file while the user is still looking at
+    the track selector, so picking one of them installs an already parsed CaptionTrack.
+
+    begin() is called from the GUI thread as soon as the track list is known: it creates an
+    empty CaptionTrack (complete=False) per ranked track and returns them, run() fills them in
+    a worker: Matroska text tracks are all read natively in one pass over the clusters, so
+    they fill side by side whichever one is picked, whatever is left goes through a single
+    multi-output ffmpeg pass.  A track that is picked while it is still being read is installed
+    as it is and keeps filling, like a streamed extraction.  Results are keyed by track index
+    and only kept for the current file, opening another one cancels everything.
+    """
+    MAX_TRACKS = 3
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path = None
+        self._cancel = threading.Event()
+        self._tracks = {}
+        self._failed = set()
+
+    def begin(self, video_path, tracks):
+        """Forget the previous file and pick the tracks to preload, returns (ranked tracks, cancel event)"""
+        self.cancel()
+        cancel = threading.Event()
+        ranked = rank_tracks(tracks)[:self.MAX_TRACKS]
+        with self._lock:
+            self._path = video_path
+            self._cancel = cancel
+            for index, _, _ in ranked:
+                track = CaptionTrack()
+                track.complete = False
+                self._tracks[index] = track
+        return ranked, cancel
+
+    def cancel(self):
+        with self._lock:
+            self._cancel.set()
+            self._path = None
+            self._tracks = {}
+            self._failed = set()
+
+    def get(self, video_path, index):
+        """The CaptionTrack of track index, done or still filling, None if it is not preloaded or failed"""
+        with self._lock:
+            if video_path != self._path or index in self._failed:
+                return None
+            return self._tracks.get(index)
+
+    def failed(self, track):
+        """True if track is a preloaded track that could not be read"""
+        with self._lock:
+            return any(self._tracks.get(index) is track for index in self._failed)
+
+    def _track(self, video_path, index, cancel):
+        with self._lock:
+            if cancel.is_set() or video_path != self._path:
+                return None
+            return self._tracks.get(index)
+
+    def _done(self, video_path, index, track, cancel):
+        if cancel.is_set():
+            # a cancelled track is partial, it stays incomplete
+            return False
+        track.complete = True
+        with self._lock:
+            if len(track) == 0 and not cancel.is_set() and video_path == self._path:
+                self._failed.add(index)
+                return False
+            return len(track) > 0
+
+    def run(self, video_path, ranked, cancel):
+        """Preload the ranked tracks, run it in a worker. Returns the indexes that are ready."""
+        ready = []
+        try:
+            tracks = {}
+            for index, _, _ in ranked:
+                track = self._track(video_path, index, cancel)
+                if track is None:
+                    return ready
+                tracks[index] = track
+            read = []
+            if tracks and os.path.splitext(video_path)[1].lower() in MATROSKA_EXTS:
+                try:
+                    read = read_mkv_subtitles(video_path, tracks, cancel, skip_unsupported=True)
+                except Exception as e:
+                    print(f"Native subtitle reader failed: {str(e)}")
+                    # failed half way, keep what was read, ffmpeg gets the empty ones
+                    read = [index for index, track in tracks.items() if len(track) > 0]
+                for index in read:
+                    if self._done(video_path, index, tracks[index], cancel):
+                        ready.append(index)
+            left = [(index, codec) for index, codec, _ in ranked if index not in read]
+            if left and not cancel.is_set():
+                contents = extract_subtitles_as_strings(
+                    video_path, [(index, codec if codec in COPY_CODECS else None) for index, codec in left], cancel)
+                for index, codec in left:
+                    track = self._track(video_path, index, cancel)
+                    if track is None:
+                        return ready
+                    content = contents.get(index)
+                    if content:
+                        if codec in COPY_CODECS:
+                            parse_ass_string(content, track)
+                        else:
+                            parse_subtitle_string(content, track)
+                    if self._done(video_path, index, track, cancel):
+                        ready.append(index)
+        except Exception as e:
+            print(f"Error preloading subtitles: {str(e)}")
+            with self._lock:
+                tracks = self._tracks if not cancel.is_set() else {}
+                for index, track in tracks.items():
+                    if not track.complete:
+                        track.complete = True
+                        if len(track) == 0:
+                            self._failed.add(index)
+        return ready
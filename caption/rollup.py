@@ -0,0 +1,136 @@
+import re
+from array import array
+from bisect import bisect_right
+
+from .parser import CUE_TAGS, timing_to_ms
+from .track import CaptionTrack, CaptionType
+
+# <00:00:01.234> inline word timestamp of YouTube auto-generated captions
+WORD_TIME_RE = re.compile(r'<(?:(\d+):)?(\d{1,2}):(\d{1,2})[.,](\d{1,3})>')
+
+
+def word_timings(raw_line, start):
+    """
+    Start time of every word (as in line.split()) of one tagged line.
+    Words before the first timestamp start with the cue.
+    :return: list of ms, None if the line carries no timestamps
+    """
+    parts = WORD_TIME_RE.split(raw_line)
+    if len(parts) == 1:
+        return None
+    times = [start] * len(CUE_TAGS.sub('', parts[0]).split())
+    # split() keeps the 4 groups of every timestamp between the text parts
+    for i in range(1, len(parts), 5):
+        t = timing_to_ms(*parts[i:i + 4])
+        times.extend([t] * len(CUE_TAGS.sub('', parts[i + 4]).split()))
+    return times
+
+
+class RollupCaptionTrack(CaptionTrack):
+    """
+    Normalized YouTube auto-generated captions.
+
+    Every caption is one fragment (the line that was being spoken) over a time range that
+    does not overlap its neighbours.  The two-line roll-up text shown by the player,
+    previous fragment above the current one, is built once when the track is created.
+
+    Word timings are kept flat: the words of caption i (fragment.split()) start at
+    word_times[word_index[i]:word_index[i + 1]], an empty range when the cue had none.
+    """
+
+    def __init__(self, caption_type=CaptionType.YOUTUBE_AUTO_GENERATED):
+        super().__init__(caption_type)
+        self.display = []
+        self.word_index = array('i', [0])
+        self.word_times = array('i')
+
+    @classmethod
+    def from_columns(cls, starts, ends, offsets, text, caption_type=CaptionType.YOUTUBE_AUTO_GENERATED,
+                     word_index=None, word_times=None):
+        track = super().from_columns(starts, ends, offsets, text, caption_type)
+        if word_index is not None:
+            track.word_index = word_index
+            track.word_times = word_times
+        else:
+            track.word_index = array('i', [0] * (len(starts) + 1))
+        track.build_display()
+        return track
+
+    def build_display(self):
+        display = []
+        prev = None
+        for seq in range(len(self)):
+            text = self.text(seq)
+            display.append(text if prev is None else f"{prev}\n{text}")
+            prev = text
+        self.display = display
+
+    def display_text(self, seq):
+        return self.display[seq]
+
+    def current_word(self, seq, t):
+        """Index of the word of caption seq being spoken at t, -1 before the first one or without timings"""
+        lo = self.word_index[seq]
+        hi = self.word_index[seq + 1]
+        if lo == hi:
+            return -1
+        return bisect_right(self.word_times, t, lo, hi) - 1 - lo if t >= self.word_times[lo] else -1
+
+    def next_word_time(self, seq, t):
+        """Start of the next word of caption seq after t, None if there is none"""
+        hi = self.word_index[seq + 1]
+        i = bisect_right(self.word_times, t, self.word_index[seq], hi)
+        return self.word_times[i] if i < hi else None
+
+
+def normalize_rollup(track):
+    """
+    Turn a YouTube auto-generated track into a RollupCaptionTrack.
+
+    Those tracks alternate between a cue that repeats the finished line and adds the one
+    being spoken (with <c> word timings), and a ~10ms cue holding only the finished line.
+    A line equal to the previous fragment is the rolled-up repeat and is dropped; a cue
+    with nothing left is a transition and only extends the current fragment.
+    The <00:00:01.234> word timestamps of the spoken line are kept as the word timings of
+    the fragment.
+    """
+    starts, ends, texts = [], [], []
+    word_index = array('i', [0])
+    word_times = array('i')
+    prev = None
+    for seq in range(len(track)):
+        start = track.starts[seq]
+        raw_lines = track.raw_text(seq).split('\n')
+        lines = [(CUE_TAGS.sub('', raw).strip(), raw) for raw in raw_lines]
+        lines = [(line, raw) for line, raw in lines if line and line != prev]
+        if not lines:
+            if ends:
+                ends[-1] = max(ends[-1], track.ends[seq])
+            continue
+        fragment = ' '.join(line for line, _ in lines)
+        if ends:
+            # display segments must not overlap
+            ends[-1] = min(ends[-1], start)
+        starts.append(start)
+        ends.append(track.ends[seq])
+        texts.append(fragment)
+        prev = lines[-1][0]
+
+        times = []
+        timed = False
+        for line, raw in lines:
+            line_times = word_timings(raw, start) if '<' in raw else None
+            if line_times is None or len(line_times) != len(line.split()):
+                line_times = [start] * len(line.split())
+            else:
+                timed = True
+            times.extend(line_times)
+        if timed:
+            word_times.extend(times)
+        word_index.append(len(word_times))
+    rollup = RollupCaptionTrack(track.caption_type)
+    rollup.extend(starts, ends, texts)
+    rollup.word_index = word_index
+    rollup.word_times = word_times
+    rollup.build_display()
+    return rollup
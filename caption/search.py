@@ -0,0 +1,130 @@
+import heapq
+import re
+import threading
+from array import array
+from bisect import bisect_left
+
+# latin words (with an apostrophe part, don't / it's) or single CJK characters
+TOKEN_RE = re.compile(r"[0-9a-z]+(?:'[a-z]+)?|[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]")
+# a query token expands to at most this many indexed words when used as a prefix
+MAX_PREFIX_TERMS = 64
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class CaptionSearchIndex:
+    """
+    Inverted index token -> caption seqs over a caption track.
+
+    build() runs once in the background after a track is loaded; a search only touches
+    the posting lists of its tokens, so it does not depend on the track size.  All query
+    tokens must match, the last one also as a prefix so results show up while typing.
+    A search never waits for indexing: it only looks at what is indexed so far and a growing
+    track (streamed extraction) is caught up by a background thread.
+    """
+    BATCH_SIZE = 2000
+
+    def __init__(self, captions):
+        self.captions = captions
+        self.postings = {}
+        self.vocab = []
+        self.indexed = 0
+        # held by search() and for the short merge of a batch, never while tokenizing
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def build(self):
+        """Index the captions added since the last call"""
+        with self._build_lock:
+            captions = self.captions
+            end = len(captions)
+            for lo in range(self.indexed, end, self.BATCH_SIZE):
+                hi = min(end, lo + self.BATCH_SIZE)
+                batch = [(seq, set(tokenize(captions[seq]['caption'].text))) for seq in range(lo, hi)]
+                with self._lock:
+                    postings = self.postings
+                    new_words = False
+                    for seq, tokens in batch:
+                        for token in tokens:
+                            seqs = postings.get(token)
+                            if seqs is None:
+                                seqs = postings[token] = array('i')
+                                new_words = True
+                            seqs.append(seq)
+                    if new_words:
+                        self.vocab = sorted(postings)
+                    self.indexed = hi
+        return self
+
+    def catch_up(self):
+        """Index new captions in a background thread, unless a build is already running"""
+        if self.indexed < len(self.captions) and not self._build_lock.locked():
+            threading.Thread(target=self.build, daemon=True).start()
+
+    def _last_postings(self, token):
+        """Posting lists the last query token matches, every word it prefixes if latin"""
+        if len(token) < 2 or not token.isascii():
+            # a single letter would expand to half the vocabulary
+            seqs = self.postings.get(token)
+            return [seqs] if seqs is not None else []
+        vocab = self.vocab
+        i = bisect_left(vocab, token)
+        lists = []
+        for word in vocab[i:i + MAX_PREFIX_TERMS]:
+            if not word.startswith(token):
+                break
+            lists.append(self.postings[word])
+        return lists
+
+    def search(self, query, limit=200):
+        """Return the seqs of the captions matching every token of the query, in time order"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # results cover the indexed part, the rest shows up on a later keystroke
+        self.catch_up()
+        with self._lock:
+            exact = [self.postings.get(token) for token in tokens[:-1]]
+            last = self._last_postings(tokens[-1])
+            if not last or any(seqs is None for seqs in exact):
+                return []
+            exact.sort(key=len)
+            if not exact or sum(map(len, last)) <= len(exact[0]):
+                driver = _merge(last)
+                groups = [[seqs] for seqs in exact]
+            else:
+                # walk the rarest token, the other lists are only probed
+                driver = exact[0]
+                groups = [[seqs] for seqs in exact[1:]] + [last]
+            result = []
+            for seq in driver:
+                if all(any(_contains(seqs, seq) for seqs in group) for group in groups):
+                    result.append(seq)
+                    if len(result) >= limit:
+                        break
+        return result
+
+
+def _contains(seqs, seq):
+    i = bisect_left(seqs, seq)
+    return i < len(seqs) and seqs[i] == seq
+
+
+def _merge(lists):
+    """Sorted, de-duplicated union of sorted posting lists"""
+    if len(lists) == 1:
+        return lists[0]
+    if sum(map(len, lists)) <= 4096:
+        # small enough that building it in C beats a lazy merge
+        return sorted(set().union(*lists))
+    return _lazy_merge(lists)
+
+
+def _lazy_merge(lists):
+    prev = -1
+    for seq in heapq.merge(*lists):
+        if seq != prev:
+            yield seq
+            prev = seq
@@ -0,0 +1,115 @@
+import re
+import threading
+from array import array
+
+# sentence end, optionally followed by closing quotes / brackets
+SENTENCE_END_RE = re.compile(r'[.!?。！？…]["\'”’)\]」』]*$')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_space(text):
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+
+class SentenceIndex:
+    """
+    Groups the cues of a track into sentence spans.
+
+    A sentence ends at a cue whose text ends with sentence punctuation, before a pause
+    longer than MAX_GAP, before a cue starting with a dialogue dash, or after MAX_CUES
+    cues (auto-generated tracks have no punctuation at all).  sentence_starts holds the
+    first cue of every sentence and cue_sentence the sentence of every cue, so going from
+    a cue to its whole sentence is O(1).
+
+    build() is incremental: a growing track is indexed up to its last cue, which stays
+    pending until the next cue shows whether there is a pause after it.  It runs in a
+    worker, lookups from the GUI thread never build: a cue that is not indexed yet starts
+    a background catch_up() and is answered with -1.
+    """
+    MAX_GAP = 1500
+    MAX_CUES = 8
+
+    def __init__(self, captions):
+        self.captions = captions
+        self.sentence_starts = array('i')
+        self.cue_sentence = array('i')
+        self._open = False
+        # any cue ending with sentence punctuation, without it every sentence is MAX_CUES long
+        self.punctuated = False
+        self._lock = threading.Lock()
+
+    def _cue(self, seq):
+        return self.captions[seq]['caption']
+
+    def build(self):
+        """Index the cues added since the last call"""
+        with self._lock:
+            n = len(self.captions)
+            # the last cue of a growing track can't be closed yet
+            stop = n if getattr(self.captions, 'complete', True) else n - 1
+            sentence_starts = self.sentence_starts
+            cue_sentence = self.cue_sentence
+            for seq in range(len(cue_sentence), stop):
+                if not self._open:
+                    sentence_starts.append(seq)
+                    self._open = True
+                cue_sentence.append(len(sentence_starts) - 1)
+                cue = self._cue(seq)
+                end = SENTENCE_END_RE.search(cue.text.rstrip())
+                if end:
+                    self.punctuated = True
+                if seq + 1 >= n:
+                    self._open = False
+                    continue
+                following = self._cue(seq + 1)
+                if (end
+                        or following.start_in_milliseconds - cue.end_in_milliseconds > self.MAX_GAP
+                        or following.text.lstrip().startswith('-')
+                        or seq + 1 - sentence_starts[-1] >= self.MAX_CUES):
+                    self._open = False
+        return self
+
+    def __len__(self):
+        return len(self.sentence_starts)
+
+    def catch_up(self):
+        """Index new cues in a background thread, unless a build is already running"""
+        if len(self.cue_sentence) < len(self.captions) and not self._lock.locked():
+            threading.Thread(target=self.build, daemon=True).start()
+
+    def sentence_of(self, seq):
+        """Sentence of cue seq, -1 if the cue is not indexed yet (it is then indexed in the background)"""
+        if seq >= len(self.cue_sentence):
+            self.catch_up()
+            return -1
+        return self.cue_sentence[seq]
+
+    def span(self, i):
+        """(first cue, last cue) of sentence i"""
+        first = self.sentence_starts[i]
+        if i + 1 < len(self.sentence_starts):
+            return first, self.sentence_starts[i + 1] - 1
+        return first, len(self.cue_sentence) - 1
+
+    def text(self, i):
+        first, last = self.span(i)
+        return normalize_space(' '.join(self._cue(seq).text for seq in range(first, last + 1)))
+
+    def expand(self, selected_text, seqs):
+        """
+        Whole sentence around a selection made in the caption area.
+        :param seqs: cues currently shown
+        :return: the sentence containing the selection, or the selection itself
+        """
+        if not self.punctuated:
+            # only the MAX_CUES cut would end a sentence, that is no sentence
+            return selected_text
+        selected = normalize_space(selected_text)
+        for seq in sorted(seqs):
+            i = self.sentence_of(seq)
+            if i == -1:
+                continue
+            sentence = self.text(i)
+            if selected and selected in sentence:
+                return sentence
+        return selected_text
@@ -2319,10 +2319,13 @@ class OfflineTranslator:
             print(e)
             return False
 
-    def query(self, word):
+    def query(self, word, lemma=None):
+        """Look up a word, falling back to its lemma (from TrackTokens) when the form itself is missing"""
         if self.star_dict:
             print("querying", word)
             sample_entry = self.star_dict.query(word)
+            if sample_entry is None and lemma and lemma != word:
+                sample_entry = self.star_dict.query(lemma)
             return render_dictionary_entry(sample_entry)
         else:
             print("Dictionary not loaded")
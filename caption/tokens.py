@@ -0,0 +1,114 @@
+import re
+import threading
+from array import array
+
+try:
+    import spacy
+except ImportError:
+    spacy = None
+
+# english words, with inner apostrophes (don't, o'clock) and hyphens (well-known)
+WORD_RE = re.compile(r"[A-Za-z]+(?:['’-][A-Za-z]+)*")
+
+_NLP = None
+_NLP_LOCK = threading.Lock()
+
+
+def get_tokenizer():
+    """spaCy's blank English pipeline (tokenizer only), None when spaCy is not installed"""
+    global _NLP
+    if spacy is None:
+        return None
+    with _NLP_LOCK:
+        if _NLP is None:
+            try:
+                _NLP = spacy.blank('en')
+            except Exception as e:
+                print(f"Error loading spaCy tokenizer: {str(e)}")
+                return None
+        return _NLP
+
+
+def regex_spans(text):
+    return [(m.start(), m.end()) for m in WORD_RE.finditer(text)]
+
+
+class TrackTokens:
+    """
+    Word spans and lemmas of every cue of a track, computed once in the background.
+
+    Spans are stored flat: the words of cue i are token_starts/token_ends[cue_index[i]:
+    cue_index[i + 1]] (character offsets into the cue text) and token_lemmas holds an id
+    into `lemmas`.  Every distinct word goes through LemmaDB once, so a lookup on the GUI
+    thread is a dict hit, never NLP work.
+    """
+    BATCH_SIZE = 512
+
+    def __init__(self, captions, lemma=None):
+        """
+        :param captions: caption track
+        :param lemma: LemmaDB used to find the stem of a word, lower-cased word if None
+        """
+        self.captions = captions
+        self.lemma = lemma
+        self.cue_index = array('i', [0])
+        self.token_starts = array('i')
+        self.token_ends = array('i')
+        self.token_lemmas = array('i')
+        self.lemmas = []
+        self._lemma_ids = {}
+        self._word_lemma = {}
+        self._lock = threading.Lock()
+
+    def lemma_of(self, word):
+        """Dictionary form of a word (running -> run), the lower-cased word when unknown"""
+        lower = word.lower().replace('’', "'")
+        lemma = self._word_lemma.get(lower)
+        if lemma is None:
+            stems = self.lemma.word_stem(lower) if self.lemma is not None else None
+            lemma = stems[0] if stems else lower
+            self._word_lemma[lower] = lemma
+        return lemma
+
+    def _lemma_id(self, word):
+        lemma = self.lemma_of(word)
+        lemma_id = self._lemma_ids.get(lemma)
+        if lemma_id is None:
+            lemma_id = self._lemma_ids[lemma] = len(self.lemmas)
+            self.lemmas.append(lemma)
+        return lemma_id
+
+    def _spans(self, texts):
+        nlp = get_tokenizer()
+        if nlp is None:
+            return [regex_spans(text) for text in texts]
+        return [[(t.idx, t.idx + len(t)) for t in doc if t.is_alpha or WORD_RE.fullmatch(t.text)]
+                for doc in nlp.pipe(texts, batch_size=self.BATCH_SIZE)]
+
+    def build(self):
+        """Tokenize the cues added since the last call"""
+        with self._lock:
+            captions = self.captions
+            n = len(captions)
+            for lo in range(len(self.cue_index) - 1, n, self.BATCH_SIZE):
+                hi = min(n, lo + self.BATCH_SIZE)
+                texts = [captions[seq]['caption'].text for seq in range(lo, hi)]
+                for text, spans in zip(texts, self._spans(texts)):
+                    for start, end in spans:
+                        self.token_starts.append(start)
+                        self.token_ends.append(end)
+                        self.token_lemmas.append(self._lemma_id(text[start:end]))
+                    # cue_index goes last, a cue only counts once its tokens are in
+                    self.cue_index.append(len(self.token_starts))
+        return self
+
+    def indexed(self, seq):
+        return seq < len(self.cue_index) - 1
+
+    def tokens(self, seq):
+        """[(start, end, lemma)] of the words of cue seq, [] if it is not tokenized yet"""
+        if not self.indexed(seq):
+            return []
+        lo, hi = self.cue_index[seq], self.cue_index[seq + 1]
+        return [(self.token_starts[i], self.token_ends[i], self.lemmas[self.token_lemmas[i]])
+                for i in range(lo, hi)]
@@ -0,0 +1,159 @@
+import threading
+from array import array
+from itertools import accumulate
+
+
+# define enum for caption type
+class CaptionType:
+    YOUTUBE_AUTO_GENERATED = 1
+    NORMAL = 2
+
+
+def format_timestamp(ms):
+    """Format milliseconds as HH:MM:SS.mmm, the way webvtt.Caption prints start/end"""
+    seconds, ms = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{ms:03d}"
+
+
+class Cue:
+    """
+    Lazy view of one caption of a CaptionTrack.
+    Offers the parts of webvtt.Caption the player uses, without owning any data.
+    """
+    __slots__ = ('track', 'seq')
+
+    def __init__(self, track, seq):
+        self.track = track
+        self.seq = seq
+
+    @property
+    def start_in_milliseconds(self):
+        return self.track.starts[self.seq]
+
+    @property
+    def end_in_milliseconds(self):
+        return self.track.ends[self.seq]
+
+    @property
+    def start(self):
+        return format_timestamp(self.start_in_milliseconds)
+
+    @property
+    def end(self):
+        return format_timestamp(self.end_in_milliseconds)
+
+    @property
+    def text(self):
+        return self.track.text(self.seq)
+
+    @property
+    def raw_text(self):
+        return self.track.raw_text(self.seq)
+
+    @property
+    def lines(self):
+        return self.text.splitlines()
+
+    def __repr__(self):
+        return f"<Cue start={self.start!r} end={self.end!r} text={self.text!r}>"
+
+
+class CaptionTrack:
+    """
+    Columnar caption store.
+
+    Start and end times live in two int32 arrays and the text of every caption is a slice
+    of one string buffer addressed by `offsets` (caption i is _text[offsets[i]:offsets[i+1]]).
+    Indexing returns the same {'caption', 'seq'} dict the player has always used, but the
+    dict and its Cue view are only built when a caption is actually accessed.
+
+    `complete` is False while a producer (lazy scan, streaming extraction) is still
+    appending captions.  `sync` is the (offset ms, drift) the caption index applies,
+    `cache_key` the caption cache entry it is saved under.
+    """
+    complete = True
+    sync = (0, 0.0)
+    cache_key = None
+    # texts with their cue tags, only kept for YouTube tracks until they are normalized
+    raw_texts = None
+
+    def __init__(self, caption_type=CaptionType.NORMAL):
+        self.caption_type = caption_type
+        self.starts = array('i')
+        self.ends = array('i')
+        self.offsets = array('i', [0])
+        self._text = ''
+        self._pending = []
+        # a streaming extraction appends while the GUI and the index workers read texts
+        self._write_lock = threading.Lock()
+
+    def append(self, start, end, text):
+        with self._write_lock:
+            self.starts.append(start)
+            self.ends.append(end)
+            self._pending.append(text)
+            # offsets goes last, len() only counts complete captions
+            self.offsets.append(self.offsets[-1] + len(text))
+
+    def extend(self, starts, ends, texts):
+        """Bulk append, used by the parsers"""
+        with self._write_lock:
+            base = self.offsets[-1]
+            self.starts.extend(starts)
+            self.ends.extend(ends)
+            self._pending.extend(texts)
+            self.offsets.extend(array('i', accumulate(map(len, texts), initial=base))[1:])
+
+    @classmethod
+    def from_columns(cls, starts, ends, offsets, text, caption_type=CaptionType.NORMAL):
+        track = cls(caption_type)
+        track.starts = starts
+        track.ends = ends
+        track.offsets = offsets
+        track._text = text
+        return track
+
+    def columns(self):
+        """Return (starts, ends, offsets, text), the whole track as four flat buffers"""
+        with self._write_lock:
+            self._flush()
+            return self.starts, self.ends, self.offsets, self._text
+
+    def _flush(self):
+        # callers hold _write_lock, texts added between the join and the reset would be lost
+        if self._pending:
+            self._text += ''.join(self._pending)
+            self._pending = []
+
+    def text(self, seq):
+        with self._write_lock:
+            self._flush()
+            offsets = self.offsets
+            return self._text[offsets[seq]:offsets[seq + 1]]
+
+    def raw_text(self, seq):
+        if self.raw_texts is not None:
+            return self.raw_texts[seq]
+        # cue tags are stripped when the track is built
+        return self.text(seq)
+
+    def close(self):
+        """Release the file behind the track, nothing to do for an in-memory track"""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, seq):
+        if isinstance(seq, slice):
+            return [self[i] for i in range(*seq.indices(len(self)))]
+        if seq < 0:
+            seq += len(self)
+        if not 0 <= seq < len(self):
+            raise IndexError("caption index out of range")
+        return {'caption': Cue(self, seq), 'seq': seq}
+
+    def __iter__(self):
+        for seq in range(len(self)):
+            yield {'caption': Cue(self, seq), 'seq': seq}
@@ -27,6 +27,7 @@ Date: 25 December 2018
 import platform
 import os
 import sys, time
+import threading
 from pathlib import Path
 
 from PyQt5.QtCore import QTimer
@@ -37,16 +38,22 @@ import vlc
 from PyQt5.QtWidgets import QShortcut
 
 from caption import get_captions, find_caption, get_template, lookup_caption, LookUpType, convert_srt_to_vtt, \
-    get_captions_from_string, CaptionType, find_captions
+    get_captions_from_string, CaptionType, find_captions, CaptionIndex, CaptionTrack, CaptionRenderer, DualCaptionIndex, \
+    CaptionSearchIndex, SentenceIndex, TrackTokens, DictionaryPrefetcher, TrackDifficulty
 from caption.extract import get_subtitle_tracks, extract_all, get_video_dimensions, get_video_frame_as_base64, \
-    extract_all_as_strings, extract_subtitle_as_string
+    extract_all_as_strings, extract_subtitle_as_string, probe_media, extract_subtitle_captions
 from caption.online_trans import OnlineTranslator
 from caption.stardict import OfflineTranslator
+from caption.cache import GLOBAL_CAPTION_CACHE
+from caption.preload import SubtitlePreloader
 from widget.player_controller import resize_player, handle_selection_changed
 from widget.player_event import mouse_press_event
 from widget.qtool import FloatingTranslation
 from widget.slider import VideoSlider, ClickableSlider
 from widget.subtitle_dialog import OptionDialog
+from widget.caption_scheduler import CaptionScheduler
+from widget.caption_search import CaptionSearchDialog
+from widget.sync_dialog import CaptionSyncDialog
 
 from widget.thread import QtThread
 from widget.thread_pool import GLOBAL_THREAD_POOL, Worker
@@ -59,6 +66,11 @@ dict_path = Path(current_dir) / "assets" / "swordword.db"
 lemma_path = Path(current_dir) / "assets" / "lemma.en.txt"
 
 
+def start_worker(func):
+    """Run func in the global thread pool, for the indexes that build in the background"""
+    GLOBAL_THREAD_POOL.start(Worker(func))
+
+
 class Player(QtWidgets.QMainWindow):
     """A simple Media Player using VLC and Qt
     """
@@ -97,13 +109,45 @@ class Player(QtWidgets.QMainWindow):
 
         self.is_paused = False
         self.captionList = []
+        self.caption_index = CaptionIndex([])
+        # second track shown under the main one (bilingual mode)
+        self.secondary_captions = None
+        # full-text index of the current track, built in the background
+        self.caption_search = None
+        # cue -> sentence spans, so selections are translated as whole sentences
+        self.caption_sentences = None
+        # word spans and lemmas of every cue, so lookups do no NLP work in the GUI thread
+        self.caption_tokens = None
+        self.search_dialog = None
+        self.sync_dialog = None
+        self.caption_renderer = CaptionRenderer()
         self.cur_caption_seq = set()
+        self.cur_caption_word = -1
+        # set to stop a running subtitle extraction
+        self.extract_cancel = threading.Event()
+        # embedded tracks extracted ahead of the user's choice
+        self.subtitle_preloader = SubtitlePreloader()
+        # option picked while its preload was still running, finished in on_preload_finished
+        self.preload_selection = None
         # get size of mdx
         self.translator = OfflineTranslator(dict_path, lemma_path)
+        # dictionary entries of the words just ahead of the playback position
+        self.dict_prefetcher = DictionaryPrefetcher(self.translator)
         self.translator2 = OnlineTranslator(url="http://211.159.170.219:3000/api/translate")
 
         self.create_ui()
 
+        # captions are updated at cue boundaries, not on every VLC time tick
+        self.caption_scheduler = CaptionScheduler(self.mediaplayer, lambda: self.caption_index,
+                                                  self.update_caption, self)
+        for event_type in (vlc.EventType.MediaPlayerPlaying, vlc.EventType.MediaPlayerPaused,
+                           vlc.EventType.MediaPlayerStopped):
+            event_manager.event_attach(event_type, self.on_play_state_changed)
+
+    def on_play_state_changed(self, event):
+        # VLC thread, the scheduler re-syncs in the GUI thread
+        self.caption_scheduler.resyncRequested.emit()
+
     def media_changed(self, event):
         print("Media Changed Event:", event)
         # Reset UI elements when media changes
@@ -133,11 +177,46 @@ class Player(QtWidgets.QMainWindow):
         #     for thread in self.translation_threads:
         #         thread.quit()
         # self.translation_threads = []
-        self.captionList = []
-        self.cur_caption_seq = set()
+        self.extract_cancel.set()
+        self.subtitle_preloader.cancel()
+        self.preload_selection = None
+        if self.secondary_captions is not None:
+            self.secondary_captions.close()
+        self.secondary_captions = None
+        self.set_caption_list([])
         self.update_tracks_menu()
         self.time_label.setText("00:00:00/??:??:??")
 
+    def set_caption_list(self, captions, caption_type=CaptionType.NORMAL):
+        """Install a loaded caption list together with its lookup index"""
+        previous = self.captionList
+        self.caption_type = caption_type
+        self.captionList = captions
+        # the callback only reads self.caption_index, swapping it is atomic
+        if self.secondary_captions is not None and caption_type == CaptionType.NORMAL:
+            self.caption_index = DualCaptionIndex(captions, self.secondary_captions, start_worker)
+        else:
+            self.caption_index = CaptionIndex(captions, start_worker)
+        self.caption_renderer.clear()
+        self.cur_caption_seq = set()
+        self.caption_renderer.difficulty = None
+        if len(captions) == 0 and getattr(captions, 'complete', True):
+            # nothing loaded (clear_player_cache), a streamed track starts empty but not complete
+            self.caption_search = None
+            self.caption_sentences = None
+            self.caption_tokens = None
+        else:
+            self.caption_search = CaptionSearchIndex(captions)
+            GLOBAL_THREAD_POOL.start(Worker(self.caption_search.build))
+            self.caption_sentences = SentenceIndex(captions)
+            GLOBAL_THREAD_POOL.start(Worker(self.caption_sentences.build))
+            self.caption_tokens = TrackTokens(captions, self.translator.lemma)
+            GLOBAL_THREAD_POOL.start(Worker(self.caption_tokens.build, on_finished=self.on_tokens_ready))
+        self.caption_scheduler.resyncRequested.emit()
+        if previous is not captions and isinstance(previous, CaptionTrack):
+            # a mapped track holds the subtitle file open (and locked on Windows)
+            previous.close()
+
     def create_ui(self):
         """Set up the user interface, signals & slots
         """
@@ -172,6 +251,13 @@ class Player(QtWidgets.QMainWindow):
         left_shortcut.activated.connect(self.on_go_back)
         right_shortcut = QShortcut(QKeySequence("Right"), self)
         right_shortcut.activated.connect(self.on_go_forward)
+        search_shortcut = QShortcut(QKeySequence("Ctrl+F"), self)
+        search_shortcut.activated.connect(self.show_caption_search)
+        # same keys as VLC for subtitle delay
+        delay_less_shortcut = QShortcut(QKeySequence("G"), self)
+        delay_less_shortcut.activated.connect(lambda: self.shift_caption_sync(-100))
+        delay_more_shortcut = QShortcut(QKeySequence("H"), self)
+        delay_more_shortcut.activated.connect(lambda: self.shift_caption_sync(100))
 
         self.hbuttonbox.addWidget(self.playbutton)
         self.playbutton.clicked.connect(self.play_pause)
@@ -235,6 +321,15 @@ class Player(QtWidgets.QMainWindow):
         caption_menu.addAction(caption_action)
         # Connect the caption action to a method
         caption_action.triggered.connect(self.load_caption)
+        secondary_action = QtWidgets.QAction("加载第二字幕(双语)", self)
+        caption_menu.addAction(secondary_action)
+        secondary_action.triggered.connect(self.load_secondary_caption)
+        search_action = QtWidgets.QAction("搜索字幕", self)
+        caption_menu.addAction(search_action)
+        search_action.triggered.connect(self.show_caption_search)
+        sync_action = QtWidgets.QAction("字幕同步", self)
+        caption_menu.addAction(sync_action)
+        sync_action.triggered.connect(self.show_sync_dialog)
 
         close_action = QtWidgets.QAction("Close App", self)
         close_shortcut = QtGui.QKeySequence(QtGui.QKeySequence.StandardKey.Close)
@@ -251,6 +346,7 @@ class Player(QtWidgets.QMainWindow):
         if current_time > back_t:
             self.mediaplayer.set_time(current_time - back_t)
             self.cur_caption_seq.clear()
+            self.caption_scheduler.resync()
 
     def on_go_forward(self):
         print("go forward")
@@ -258,6 +354,7 @@ class Player(QtWidgets.QMainWindow):
         current_time = self.mediaplayer.get_time()
         if current_time < self.mediaplayer.get_length() - forward_t:
             self.mediaplayer.set_time(current_time + forward_t)
+            self.caption_scheduler.resync()
 
 
 
@@ -291,6 +388,15 @@ class Player(QtWidgets.QMainWindow):
         caption_action = QtWidgets.QAction("挂载字幕", self)
         caption_action.triggered.connect(self.load_caption)
         self.caption_menu.addAction(caption_action)
+        secondary_action = QtWidgets.QAction("加载第二字幕(双语)", self)
+        secondary_action.triggered.connect(self.load_secondary_caption)
+        self.caption_menu.addAction(secondary_action)
+        search_action = QtWidgets.QAction("搜索字幕", self)
+        search_action.triggered.connect(self.show_caption_search)
+        self.caption_menu.addAction(search_action)
+        sync_action = QtWidgets.QAction("字幕同步", self)
+        sync_action.triggered.connect(self.show_sync_dialog)
+        self.caption_menu.addAction(sync_action)
         self.caption_menu.addSeparator()
 
         # Add audio tracks submenu
@@ -445,6 +551,11 @@ class Player(QtWidgets.QMainWindow):
         if result:
             ffmpeg_tracks, ffmpeg_w, ffmpeg_h, filename = result
             self.subtitle_tracks = ffmpeg_tracks
+            # start on the likely tracks while the selector is open
+            ranked, cancel = self.subtitle_preloader.begin(filename, ffmpeg_tracks)
+            if ranked:
+                GLOBAL_THREAD_POOL.start(Worker(self.subtitle_preloader.run, filename, ranked, cancel,
+                                                on_finished=self.on_preload_finished))
             resize_player(self, ffmpeg_w, ffmpeg_h)
             self.update_tracks_menu()
             options = [f"{track[1]} {track[0]} {track[2]}" for track in ffmpeg_tracks]
@@ -494,12 +605,13 @@ class Player(QtWidgets.QMainWindow):
         if ext not in ['.mp4', '.mkv', '.avi', '.webm', '.flv', '.mov', '.wmv', '.mpg', '.mpeg', '.m4v']:
             QtWidgets.QMessageBox.warning(self, "Error", "Unsupported file format")
             return
-        if ext == ".mkv":
+        if ext in (".mkv", ".webm"):
             # Get video information
             def ffmpeg_parse():
                 self.ignore_user = True
-                ffmpeg_tracks = get_subtitle_tracks(filename[0])
-                ffmpeg_w, ffmpeg_h = get_video_dimensions(filename[0])
+                # tracks and size from the Matroska header, ffprobe only if that fails
+                info = probe_media(filename[0])
+                ffmpeg_tracks, ffmpeg_w, ffmpeg_h = info['tracks'], info['width'], info['height']
                 print("result is", ffmpeg_tracks, ffmpeg_w, ffmpeg_h)
                 return ffmpeg_tracks, ffmpeg_w, ffmpeg_h, filename[0]  # Return as tuple
                 
@@ -545,27 +657,79 @@ class Player(QtWidgets.QMainWindow):
         index = selected_option.get('index')
         self.embed_caption_dict.clear()
         print("selected option", selected_option)
+        preloaded = self.subtitle_preloader.get(filename, index)
+        if preloaded is not None:
+            # done or still being read by the preload, either way no second extraction
+            self.extract_cancel.set()
+            self.preload_selection = None if preloaded.complete else selected_option
+            self.set_caption_list(preloaded)
+            self.ignore_user = False
+            if preloaded.complete:
+                html = get_template("welcome", f"加载第{index}条内置字幕, 共{len(preloaded)}条")
+            else:
+                html = get_template("welcome", f"正在加载第{index}条内置字幕...")
+            self.caption.setHtml(html)
+            return
+        # install the track right away, it is filled while extracting
+        self.preload_selection = None
+        self.extract_cancel.set()
+        cancel = threading.Event()
+        self.extract_cancel = cancel
+        track = CaptionTrack()
+        track.complete = False
+        self.set_caption_list(track)
+        self.ignore_user = False
+        html = get_template("welcome", f"正在加载第{index}条内置字幕...")
+        self.caption.setHtml(html)
+
+        codec = self.subtitle_tracks[index][1] if index < len(self.subtitle_tracks) else None
+
         def extract_now():
             print("start extract subtitle")
-            # mock time consuming task
-            time.sleep(10)
-            ret = []
-            subtitle_content = extract_subtitle_as_string(filename, track_index=index)
-            if subtitle_content:
-                ret = get_captions_from_string(subtitle_content)
-            return ret
+            try:
+                return extract_subtitle_captions(filename, track_index=index, track=track, cancel_event=cancel,
+                                                 codec=codec)
+            except Exception as e:
+                print(f"Error extracting subtitle track {index}: {str(e)}")
+                return track
+            finally:
+                if not cancel.is_set():
+                    # failed or empty, either way nothing is loading any more
+                    track.complete = True
 
         def on_finished(result):
+            if self.caption_tokens is not None and self.caption_tokens.captions is result:
+                # tokenize the cues that arrived after the first pass
+                GLOBAL_THREAD_POOL.start(Worker(self.caption_tokens.build, on_finished=self.on_tokens_ready))
+            if cancel.is_set():
+                return
             if len(result) > 0:
-                self.captionList = result
                 html = get_template("welcome", f"加载第{index}条内置字幕, 共{len(result)}条")
-                QtCore.QMetaObject.invokeMethod(self.caption, "setHtml", QtCore.Qt.QueuedConnection,
-                                                QtCore.Q_ARG(str, html))
-                self.ignore_user = False
+            else:
+                # broken track or a bitmap one (PGS, VobSub) that has no text
+                html = get_template("welcome", f"第{index}条内置字幕加载失败, 请选择其他字幕")
+            QtCore.QMetaObject.invokeMethod(self.caption, "setHtml", QtCore.Qt.QueuedConnection,
+                                            QtCore.Q_ARG(str, html))
 
         # put in thread pool
         GLOBAL_THREAD_POOL.start(Worker(extract_now, on_finished=on_finished))
 
+    def on_preload_finished(self, ready):
+        """The preload is done, finish off a preloaded track that was installed while it was still filling"""
+        captions = self.captionList
+        if self.preload_selection is None or not getattr(captions, 'complete', True):
+            return
+        selection, self.preload_selection = self.preload_selection, None
+        if self.subtitle_preloader.failed(captions):
+            # nothing came out of the preload, extract it the normal way
+            self.on_subtitle_selected(selection)
+            return
+        if self.caption_tokens is not None and self.caption_tokens.captions is captions:
+            # tokenize the cues that arrived after the first pass
+            GLOBAL_THREAD_POOL.start(Worker(self.caption_tokens.build, on_finished=self.on_tokens_ready))
+        html = get_template("welcome", f"加载第{selection.get('index')}条内置字幕, 共{len(captions)}条")
+        self.caption.setHtml(html)
+
     def time_changed_callback(self, event):
         media_pos = int(self.mediaplayer.get_position() * 1000)
         # print('set position', media_pos)
@@ -573,42 +737,65 @@ class Player(QtWidgets.QMainWindow):
                                         QtCore.Q_ARG(int, media_pos))
         current_time = self.mediaplayer.get_time()  # 获取当前播放时间（单位：毫秒）
         self.refresh_time_label()
+        # captions follow the scheduler, only tell it when the clock jumped
+        self.caption_scheduler.check_drift(current_time)
 
-        if self.captionList:
+    def update_caption(self, current_time):
+        index = self.caption_index
+        if len(index) > 0:
             if self.caption_type == CaptionType.NORMAL:
-                cur_caption = find_caption(current_time, self.captionList, self.cur_caption_seq)
-                if cur_caption and cur_caption['seq'] not in self.cur_caption_seq:
-                    self.cur_caption_seq.clear()
-                    text = cur_caption['caption'].text
-                    text = text.replace('&nbsp;', ' ').replace('\n', ' ')
-                    text = text.replace('{', '{{').replace('}', '}}')
-
-                    self.cur_caption_seq.add(cur_caption['seq'])
-                    html = get_template("caption", text)
+                seqs = index.active(current_time)
+                if not seqs:
+                    # between captions keep showing the upcoming one
+                    cur_caption = find_caption(current_time, index.captions, self.cur_caption_seq, index=index)
+                    seqs = [cur_caption['seq']] if cur_caption else []
+                if seqs and set(seqs) != self.cur_caption_seq:
+                    self.cur_caption_seq = set(seqs)
+                    if isinstance(index, DualCaptionIndex):
+                        second_seqs = []
+                        for seq in seqs:
+                            partner = index.partner(seq)
+                            if partner != -1 and partner not in second_seqs:
+                                second_seqs.append(partner)
+                        html = self.caption_renderer.render_dual(index.captions, seqs, index.secondary, second_seqs)
+                    else:
+                        html = self.caption_renderer.render(index.captions, seqs)
                     QtCore.QMetaObject.invokeMethod(self.caption, "setHtml", QtCore.Qt.QueuedConnection,
                                                     QtCore.Q_ARG(str, html))
+                    self.prefetch_dictionary(index.captions, min(seqs))
             elif self.caption_type == CaptionType.YOUTUBE_AUTO_GENERATED:
-                all_text = []
-                first, second = find_captions(current_time, self.captionList, self.cur_caption_seq)
-                # print("first", first, "second", second, "cur", current_time)
-                if first and first['seq'] in self.cur_caption_seq:
-                    return
-                if second and second['seq'] in self.cur_caption_seq:
-                    return
-                self.cur_caption_seq.clear()
-                if first:
-                    self.cur_caption_seq.add(first['seq'])
-                    all_text.append(first['caption'].text)
-                if second:
-                    self.cur_caption_seq.add(second['seq'])
-                    all_text.append(second['caption'].text)
-                if len(all_text) > 0:
-                    text = " ".join(all_text)
-                    text = text.replace('&nbsp;', ' ').replace('\n', ' ')
-                    text = text.replace('{', '{{').replace('}', '}}')
-                    html = get_template("caption", text)
+                # segments of a roll-up track don't overlap and carry their two-line text,
+                # the scheduler also wakes up at every word start to move the highlight
+                seq, word = index.current_word(current_time)
+                if seq != -1 and (seq not in self.cur_caption_seq or word != self.cur_caption_word):
+                    self.cur_caption_seq = {seq}
+                    self.cur_caption_word = word
+                    html = self.caption_renderer.render(index.captions, [seq], word)
                     QtCore.QMetaObject.invokeMethod(self.caption, "setHtml", QtCore.Qt.QueuedConnection,
                                                     QtCore.Q_ARG(str, html))
+                    self.prefetch_dictionary(index.captions, seq)
+
+    def on_tokens_ready(self, tokens):
+        """Score the vocabulary of the track once it is tokenized"""
+        if tokens is not self.caption_tokens or not getattr(tokens.captions, 'complete', True):
+            return
+        difficulty = TrackDifficulty(tokens, self.translator.star_dict)
+        GLOBAL_THREAD_POOL.start(Worker(difficulty.build, on_finished=self.on_difficulty_ready))
+
+    def on_difficulty_ready(self, difficulty):
+        if difficulty.tokens is not self.caption_tokens or difficulty.word_difficulty is None:
+            return
+        print(f"track difficulty {difficulty.difficulty:.2f}, coverage {difficulty.coverage:.1%}, "
+              f"hard words {difficulty.hard_ratio:.1%}")
+        self.caption_renderer.difficulty = difficulty
+        self.caption_renderer.clear()
+        self.cur_caption_seq = set()
+        self.setWindowTitle(f"CompreVids️ - 难度 {difficulty.difficulty:.0%} 覆盖率 {difficulty.coverage:.0%}")
+
+    def prefetch_dictionary(self, captions, seq):
+        """Look up the words of the next cues in the background, so clicking one shows it at once"""
+        if self.dict_prefetcher.claim(captions, seq):
+            GLOBAL_THREAD_POOL.start(Worker(self.dict_prefetcher.prefetch, captions, seq, self.caption_tokens))
 
 
     def set_volume(self, volume):
@@ -629,6 +816,7 @@ class Player(QtWidgets.QMainWindow):
         print('pos', pos)
         self.mediaplayer.set_position(pos / 1000.0)
         self.cur_caption_seq.clear()
+        self.caption_scheduler.resync()
 
 
 
@@ -638,7 +826,7 @@ class Player(QtWidgets.QMainWindow):
         if self.mediaplayer.get_media():
             dialog_txt = "Choose Caption File"
             filename, _ = QtWidgets.QFileDialog.getOpenFileName(self, dialog_txt, os.path.expanduser('~'),
-                                                                "webVTT (*.vtt);;srt Files (*.srt)")
+                                                                "webVTT (*.vtt);;srt Files (*.srt);;ASS/SSA (*.ass *.ssa)")
             self.backend_load_caption(filename)
         else:
             QtWidgets.QMessageBox.warning(self, "Error", "Please load a video file first")
@@ -648,7 +836,6 @@ class Player(QtWidgets.QMainWindow):
             def load_caption():
                 if filename:
                     ret, _type = get_captions(filename)
-                    self.cur_caption_seq.clear()
                     return ret, _type
                 return [], None
 
@@ -656,21 +843,99 @@ class Player(QtWidgets.QMainWindow):
                 ret, _type = result
                 if len(ret) > 0:
                     print("get options ok", len(ret))
-                    self.captionList = ret
+                    self.set_caption_list(ret, _type)
                     html = get_template("welcome", f"加载[En]字幕文件成功, _type: {_type}")
                     QtCore.QMetaObject.invokeMethod(self.caption, "setHtml", QtCore.Qt.QueuedConnection,
                                                     QtCore.Q_ARG(str, html))
-                    self.caption_type = _type
 
             GLOBAL_THREAD_POOL.start(Worker(load_caption, on_finished=on_finished))
 
 
+    def show_caption_search(self):
+        if self.search_dialog is None:
+            self.search_dialog = CaptionSearchDialog(lambda: self.caption_search, self)
+            self.search_dialog.seekRequested.connect(self.seek_to_time)
+        self.search_dialog.show()
+        self.search_dialog.raise_()
+        self.search_dialog.query_edit.setFocus()
+
+    def show_sync_dialog(self):
+        index = self.caption_index
+        if self.sync_dialog is None:
+            self.sync_dialog = CaptionSyncDialog(index.offset, index.drift, self)
+            self.sync_dialog.syncChanged.connect(self.set_caption_sync)
+        else:
+            self.sync_dialog.set_values(index.offset, index.drift)
+        self.sync_dialog.show()
+        self.sync_dialog.raise_()
+
+    def shift_caption_sync(self, delta):
+        index = self.caption_index
+        self.set_caption_sync(index.offset + delta, index.drift)
+        if self.sync_dialog is not None:
+            self.sync_dialog.set_values(index.offset, index.drift)
+        print("caption offset", index.offset)
+
+    def set_caption_sync(self, offset, drift):
+        """Re-time the current captions, only the query time of the index changes"""
+        self.caption_index.set_sync(offset, drift)
+        captions = self.caption_index.captions
+        if isinstance(captions, CaptionTrack):
+            captions.sync = (offset, drift)
+            if captions.cache_key:
+                GLOBAL_CAPTION_CACHE.store_sync(captions.cache_key, offset, drift)
+        self.cur_caption_seq.clear()
+        self.caption_scheduler.resync()
+
+    def seek_to_time(self, ms):
+        if not self.mediaplayer.get_media():
+            return
+        self.mediaplayer.set_time(ms)
+        self.cur_caption_seq.clear()
+        self.caption_scheduler.resync()
+
+    def load_secondary_caption(self):
+        """Load a second caption file (e.g. Chinese) to show under the current one"""
+        if not self.mediaplayer.get_media():
+            QtWidgets.QMessageBox.warning(self, "Error", "Please load a video file first")
+            return
+        filename, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Choose Second Caption File",
+                                                            os.path.expanduser('~'),
+                                                            "webVTT (*.vtt);;srt Files (*.srt);;ASS/SSA (*.ass *.ssa)")
+        if not filename:
+            return
+
+        def load_caption():
+            ret, _type = get_captions(filename)
+            if len(ret) > 0 and not getattr(ret, 'complete', True):
+                # alignment needs the whole second track, get_captions is already scanning it
+                ret.wait_complete()
+            return ret, _type
+
+        def on_finished(result):
+            ret, _type = result
+            if len(ret) > 0:
+                print("get secondary captions ok", len(ret))
+                if self.secondary_captions is not None:
+                    self.secondary_captions.close()
+                self.secondary_captions = ret
+                if self.caption_type == CaptionType.NORMAL:
+                    # only the index changes, the primary track and its workers stay as they are
+                    self.caption_index = DualCaptionIndex(self.captionList, ret, start_worker)
+                    self.caption_renderer.clear()
+                    self.cur_caption_seq = set()
+                html = get_template("welcome", "加载第二字幕成功, 双语模式")
+                QtCore.QMetaObject.invokeMethod(self.caption, "setHtml", QtCore.Qt.QueuedConnection,
+                                                QtCore.Q_ARG(str, html))
+
+        GLOBAL_THREAD_POOL.start(Worker(load_caption, on_finished=on_finished))
+
     def backend_load_caption_from_str(self, content):
         if len(content) > 0:
             ret = get_captions_from_string(content)
             if len(ret) > 0:
                 print("get options ok", len(ret))
-                self.captionList = ret
+                self.set_caption_list(ret)
                 html = get_template("welcome", "已发现内置[En]字幕文件")
                 QtCore.QMetaObject.invokeMethod(self.caption, "setHtml", QtCore.Qt.QueuedConnection,
                                                 QtCore.Q_ARG(str, html))
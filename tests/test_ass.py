@@ -0,0 +1,61 @@
+from caption.ass import AssStreamParser, ass_text, ass_time_to_ms, parse_ass_string
+
+ASS = """[Script Info]
+Title: test
+PlayResX: 1920
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize
+Style: Default,Arial,20
+
+[Events]
+Format: Layer, Style, Start, End, Name, MarginL, MarginR, MarginV, Effect, Text
+Comment: 0,Default,0:00:00.00,0:00:09.00,,0,0,0,,not shown
+Dialogue: 0,Default,0:00:03.00,0:00:04.00,,0,0,0,,second, with a comma
+Dialogue: 0,Default,0:00:01.50,0:00:02.00,,0,0,0,,{\\an8\\c&H00FFFF&}first\\Nline\\hone
+Dialogue: 1,Default,0:00:01.50,0:00:02.00,,0,0,0,,{\\bord3}first\\Nline\\hone
+Dialogue: 0,Default,0:00:05.00,0:00:06.00,,0,0,0,,{\\p1}m 0 0 l 100 0 100 100{\\p0}
+Dialogue: 0,Default,0:00:07.00,0:00:08.00,,0,0,0,,{\\i1}{\\i0}
+Dialogue: 0,Default,1:02:03.4,1:02:04.567,,0,0,0,,odd fractions
+"""
+
+EXPECTED = [
+    (1500, 2000, "first\nline one"),
+    (3000, 4000, "second, with a comma"),
+    (3723400, 3724567, "odd fractions"),
+]
+
+
+def cues(track):
+    return [(track.starts[i], track.ends[i], track.text(i)) for i in range(len(track))]
+
+
+def test_ass_time_to_ms():
+    assert ass_time_to_ms("0:01:02.03") == 62030
+    assert ass_time_to_ms("10:00:00.5") == 36000500
+
+
+def test_ass_text():
+    assert ass_text("{\\b1}a{\\b0}\\nb\\hc") == "a\nb c"
+
+
+def test_parse_ass():
+    track = parse_ass_string(ASS)
+    assert track.complete
+    assert cues(track) == EXPECTED
+    assert cues(parse_ass_string(ASS.replace("\n", "\r\n"))) == EXPECTED
+
+
+def test_dialogue_outside_events_ignored():
+    assert len(parse_ass_string("[Script Info]\nDialogue: 0,0:00:01.00,0:00:02.00,D,,0,0,0,,x\n")) == 0
+
+
+def test_stream_chunks():
+    # ffmpeg writes the events in time order, layered copies may still end up in different chunks
+    lines = ASS.split("\n")
+    ordered = "\n".join(lines[:11] + [lines[12], lines[13], lines[11]] + lines[14:])
+    for size in (1, 5, 40):
+        parser = AssStreamParser()
+        for i in range(0, len(ordered), size):
+            parser.feed(ordered[i:i + size])
+        assert cues(parser.close()) == EXPECTED, size
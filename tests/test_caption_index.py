@@ -0,0 +1,85 @@
+import random
+
+from caption.caption import CaptionIndex
+from caption.track import CaptionTrack
+
+
+def random_track(rnd, n):
+    starts = sorted(rnd.randrange(0, n * 500) for _ in range(n))
+    # zero length, short and long captions that overlap many others
+    ends = [start + rnd.choice((0, 1, rnd.randrange(1, 2000), rnd.randrange(1, 20000))) for start in starts]
+    track = CaptionTrack()
+    track.extend(starts, ends, [str(i) for i in range(n)])
+    return track
+
+
+def brute_force(track, t):
+    return [i for i in range(len(track)) if track.starts[i] <= t < track.ends[i]]
+
+
+def query_times(rnd, track):
+    edges = [t for i in range(len(track)) for t in (track.starts[i], track.ends[i])]
+    times = [t + d for t in edges for d in (-1, 0, 1)] + [rnd.randrange(-100, track.ends[-1] + 100) for _ in range(500)]
+    # in playback order (cached windows) and shuffled
+    return sorted(times) + rnd.sample(times, len(times))
+
+
+def test_active_matches_brute_force():
+    rnd = random.Random(1)
+    for n in (0, 1, 2, 10, 300):
+        track = random_track(rnd, n) if n else CaptionTrack()
+        index = CaptionIndex(track)
+        for t in (query_times(rnd, track) if n else [-1, 0, 1]):
+            assert list(index.active(t)) == brute_force(track, t), (n, t)
+
+
+def test_active_on_growing_track():
+    rnd = random.Random(2)
+    full = random_track(rnd, 400)
+    track = CaptionTrack()
+    track.complete = False
+    index = CaptionIndex(track)
+    for lo in range(0, 400, 37):
+        hi = min(lo + 37, 400)
+        track.extend(full.starts[lo:hi], full.ends[lo:hi], [str(i) for i in range(lo, hi)])
+        if hi == 400:
+            track.complete = True
+        for t in query_times(rnd, track)[:300]:
+            assert list(index.active(t)) == brute_force(track, t), (hi, t)
+
+
+def test_active_with_sync():
+    rnd = random.Random(3)
+    track = random_track(rnd, 200)
+    index = CaptionIndex(track)
+    index.set_sync(1500, 0.001)
+    for t in query_times(rnd, track):
+        assert list(index.active(t)) == brute_force(track, index.to_track_time(t)), t
+
+
+def test_active_before_the_tree_is_built():
+    rnd = random.Random(4)
+    track = random_track(rnd, 300)
+    builds = []
+    index = CaptionIndex(track, start_worker=builds.append)
+    assert index.tree.count == 0 and len(builds) == 1
+    times = query_times(rnd, track)
+    for t in times:
+        assert list(index.active(t)) == brute_force(track, t), t
+    # one pending build at a time
+    assert len(builds) == 1
+    builds.pop()()
+    assert index.tree.count == len(track)
+    for t in times:
+        assert list(index.active(t)) == brute_force(track, t), t
+
+
+def test_next_boundary_before_the_tree_is_built():
+    rnd = random.Random(5)
+    track = random_track(rnd, 200)
+    edges = sorted(set(track.starts) | set(track.ends))
+    waiting = CaptionIndex(track, start_worker=lambda func: None)
+    built = CaptionIndex(track)
+    for t in query_times(rnd, track):
+        expected = next((edge for edge in edges if edge > t), None)
+        assert waiting.next_boundary(t) == built.next_boundary(t) == expected, t
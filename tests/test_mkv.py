@@ -0,0 +1,197 @@
+import struct
+import threading
+import zlib
+
+import pytest
+
+from caption.mkv import *
+
+CUE_TIME = 0xB3
+UNKNOWN_SIZE = b'\x01\xff\xff\xff\xff\xff\xff\xff'
+
+
+def vint(n):
+    length = 1
+    while n >= (1 << (7 * length)) - 1:
+        length += 1
+    return ((1 << (7 * length)) | n).to_bytes(length, 'big')
+
+
+def el(element_id, data, unknown=False):
+    if isinstance(data, list):
+        data = b''.join(data)
+    elif isinstance(data, int):
+        data = data.to_bytes(max(1, (data.bit_length() + 7) // 8), 'big')
+    elif isinstance(data, str):
+        data = data.encode()
+    element = element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big')
+    return element + (UNKNOWN_SIZE if unknown else vint(len(data))) + data
+
+
+def block(number, relative, payload, flags=0x80):
+    return vint(number) + relative.to_bytes(2, 'big', signed=True) + bytes([flags]) + payload
+
+
+def make_mkv(events, codec='S_TEXT/UTF8', cues='relative', group=True, encoding=None, unknown_cluster=False):
+    """
+    Video track 1 and a subtitle track 2 holding events [(start ms, duration ms, text)],
+    a cluster every 5s with a video frame per second.  cues is 'relative' (a cue per
+    subtitle block with its position in the cluster), 'cluster', 'partial' (only every
+    other subtitle block is cued), 'video' (only the video track is cued) or 'none'.
+    """
+    entry = [el(TRACK_NUMBER, 2), el(TRACK_TYPE, TRACK_TYPE_SUBTITLE), el(CODEC_ID, codec), el(LANGUAGE, 'chi')]
+    if encoding is not None:
+        algo, settings = encoding
+        compression = [el(CONTENT_COMP_ALGO, algo)] + ([el(CONTENT_COMP_SETTINGS, settings)] if settings else [])
+        entry.append(el(CONTENT_ENCODINGS, [el(CONTENT_ENCODING, [el(CONTENT_COMPRESSION, compression)])]))
+    head = el(INFO, [el(TIMECODE_SCALE, 1000000), el(SEGMENT_DURATION, struct.pack('>d', 60000.0))])
+    head += el(TRACKS, [
+        el(TRACK_ENTRY, [el(TRACK_NUMBER, 1), el(TRACK_TYPE, TRACK_TYPE_VIDEO), el(CODEC_ID, 'V_MPEG4/ISO/AVC'),
+                         el(VIDEO, [el(PIXEL_WIDTH, 1920), el(PIXEL_HEIGHT, 800)])]),
+        el(TRACK_ENTRY, entry)])
+
+    def payload(text):
+        data = text.encode()
+        if encoding is not None and encoding[0] == 0:
+            return zlib.compress(data)
+        if encoding is not None and encoding[0] == 3:
+            assert data.startswith(encoding[1])
+            return data[len(encoding[1]):]
+        return data
+
+    clusters = []
+    for timecode in range(0, max(start for start, _, _ in events) + 5000, 5000):
+        items = [(frame, None, b'\0' * 500) for frame in range(0, 5000, 1000)]
+        items += [(start - timecode, (duration, text), None) for start, duration, text in events
+                  if timecode <= start < timecode + 5000]
+        items.sort(key=lambda item: item[0])
+        inner = el(CLUSTER_TIMECODE, timecode)
+        subtitle_blocks = []
+        for relative, event, frame in items:
+            if event is None:
+                inner += el(SIMPLE_BLOCK, block(1, relative, frame))
+                continue
+            subtitle_blocks.append((timecode + relative, len(inner)))
+            duration, text = event
+            if group and duration is not None:
+                inner += el(BLOCK_GROUP, [el(BLOCK, block(2, relative, payload(text), 0)), el(BLOCK_DURATION, duration)])
+            else:
+                inner += el(SIMPLE_BLOCK, block(2, relative, payload(text)))
+        clusters.append((el(CLUSTER, inner, unknown=unknown_cluster), subtitle_blocks))
+
+    def seek_head(cues_pos):
+        return el(SEEK_HEAD, [el(SEEK, [el(SEEK_ID, CUES.to_bytes(4, 'big')),
+                                       el(SEEK_POSITION, cues_pos.to_bytes(8, 'big'))])])
+
+    pos = len(seek_head(0)) + len(head)
+    body, points = b'', []
+    for k, (cluster, subtitle_blocks) in enumerate(clusters):
+        if cues == 'video':
+            subtitle_blocks = []
+            positions = [el(CUE_TRACK, 1), el(CUE_CLUSTER_POSITION, pos)]
+            points.append(el(CUE_POINT, [el(CUE_TIME, k * 5000), el(CUE_TRACK_POSITIONS, positions)]))
+        for n, (time, relative) in enumerate(subtitle_blocks):
+            if cues == 'partial' and (k + n) % 2 == 0:
+                continue
+            positions = [el(CUE_TRACK, 2), el(CUE_CLUSTER_POSITION, pos)]
+            if cues in ('relative', 'partial'):
+                positions.append(el(CUE_RELATIVE_POSITION, relative))
+            points.append(el(CUE_POINT, [el(CUE_TIME, time), el(CUE_TRACK_POSITIONS, positions)]))
+        body += cluster
+        pos += len(cluster)
+    segment = seek_head(pos) + head + body
+    if cues != 'none':
+        segment += el(CUES, points)
+    return el(EBML, [el(DOC_TYPE, 'matroska')]) + el(SEGMENT, segment)
+
+
+EVENTS = [(1000, 1500, 'first'), (4900, 200, 'crosses <i>a</i>\r\ncluster'), (5000, None, 'no duration'),
+          (7000, None, 'last')]
+EXPECTED = [(1000, 2500, 'first'), (4900, 5100, 'crosses a\ncluster'), (5000, 7000, 'no duration'),
+            (7000, 7000 + DEFAULT_CUE_MS, 'last')]
+
+
+def cues(track):
+    return [(track.starts[i], track.ends[i], track.text(i)) for i in range(len(track))]
+
+
+def write(tmp_path, data):
+    path = tmp_path / 'video.mkv'
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize('cue_mode', ['relative', 'cluster', 'partial', 'video', 'none'])
+@pytest.mark.parametrize('group', [True, False])
+@pytest.mark.parametrize('unknown_cluster', [False, True])
+def test_read_subtitle(tmp_path, cue_mode, group, unknown_cluster):
+    events = EVENTS if group else [(start, None, text) for start, _, text in EVENTS]
+    expected = EXPECTED if group else [(1000, 1000 + DEFAULT_CUE_MS, 'first'), (4900, 5000, EXPECTED[1][2])] + EXPECTED[2:]
+    path = write(tmp_path, make_mkv(events, cues=cue_mode, group=group, unknown_cluster=unknown_cluster))
+    track = read_mkv_subtitle(path, 0)
+    assert track.complete
+    assert cues(track) == expected
+
+
+def test_cue_relative_positions(tmp_path):
+    path = write(tmp_path, make_mkv(EVENTS))
+    with MatroskaFile(path) as mkv:
+        positions = mkv.cue_positions([2])[2]
+        assert len(positions) == len(EVENTS)
+        for cluster, relative in positions:
+            element_id, _, data = read_element(mkv.buf, cluster)
+            assert element_id == CLUSTER
+            assert read_element(mkv.buf, data + relative)[0] in (SIMPLE_BLOCK, BLOCK_GROUP)
+        assert [start for _, start, _, _ in mkv.read_blocks([2])] == [start for start, _, _ in EVENTS]
+
+
+def test_cues_only_a_seek_hint(tmp_path):
+    # the first cued block is in the second cluster, the blocks after it are not cued
+    events = [(6000, 500, 'cued'), (7000, 500, 'not cued'), (12000, 500, 'next cluster')]
+    data = make_mkv(events, cues='partial')
+    with MatroskaFile(write(tmp_path, data)) as mkv:
+        assert len(mkv.cue_positions([2])[2]) == 1
+    assert [text for _, _, text in cues(read_mkv_subtitle(write(tmp_path, data), 0))] == [
+        'cued', 'not cued', 'next cluster']
+
+
+def test_cancelled_read_stays_incomplete(tmp_path):
+    cancel = threading.Event()
+    cancel.set()
+    track = read_mkv_subtitle(write(tmp_path, make_mkv(EVENTS)), 0, cancel_event=cancel)
+    assert not track.complete and len(track) == 0
+
+
+@pytest.mark.parametrize('encoding', [(0, None), (3, b'0,0,Default,,0,0,0,,')])
+def test_compressed_payloads(tmp_path, encoding):
+    events = [(1000, 1000, '0,0,Default,,0,0,0,,{\\b1}hello\\Nworld'),
+              (3000, 1000, '0,0,Default,,0,0,0,,{\\p1}m 0 0 l 1 1{\\p0}')]
+    path = write(tmp_path, make_mkv(events, codec='S_TEXT/ASS', encoding=encoding))
+    assert cues(read_mkv_subtitle(path, 0)) == [(1000, 2000, 'hello\nworld')]
+
+
+def test_unsupported_codec(tmp_path):
+    path = write(tmp_path, make_mkv(EVENTS, codec='S_HDMV/PGS'))
+    with pytest.raises(ValueError):
+        read_mkv_subtitle(path, 0)
+    with pytest.raises(ValueError):
+        read_mkv_subtitle(path, 1)
+
+
+def test_laced_blocks_rejected(tmp_path):
+    data = make_mkv([(1000, None, 'x')], group=False)
+    laced = data.replace(block(2, 1000, b'x'), block(2, 1000, b'x', flags=0x82))
+    assert laced != data
+    with pytest.raises(ValueError):
+        read_mkv_subtitle(write(tmp_path, laced), 0)
+
+
+@pytest.mark.parametrize('head_bytes', [40, 200, HEAD_BYTES])
+def test_read_head(tmp_path, head_bytes):
+    path = write(tmp_path, make_mkv(EVENTS))
+    head = read_mkv_head(path, head_bytes)
+    assert head['duration'] == 60000
+    assert [(track['number'], track['type'], track['codec'], track['language']) for track in head['tracks']] == [
+        (1, TRACK_TYPE_VIDEO, 'V_MPEG4/ISO/AVC', 'eng'), (2, TRACK_TYPE_SUBTITLE, 'S_TEXT/UTF8', 'chi')]
+    assert head['tracks'][0]['width'] == 1920
+    assert CUES in head['positions'] and head['first_cluster'] is not None
@@ -0,0 +1,64 @@
+from caption.parser import parse_subtitle_string, SubtitleStreamParser
+from caption.track import CaptionType
+
+SRT = """1
+00:00:01,000 --> 00:00:02,500
+Hello <i>there</i>
+
+2
+00:00:03,000 --> 00:00:04,000
+Two
+lines
+
+3
+00:01:05,5 --> 01:00:00,120
+short fraction
+"""
+
+
+def cues(track):
+    return [(track.starts[i], track.ends[i], track.text(i)) for i in range(len(track))]
+
+
+def test_srt():
+    assert cues(parse_subtitle_string(SRT)) == [
+        (1000, 2500, "Hello there"),
+        (3000, 4000, "Two\nlines"),
+        (65500, 3600120, "short fraction"),
+    ]
+
+
+def test_vtt_header_note_and_identifiers():
+    vtt = ("WEBVTT\nKind: captions\n\nNOTE a comment\n\nintro\n00:01.000 --> 00:02.000 align:start\n"
+           "first\n\n00:00:03.000 --> 00:00:04.000\nsecond\n")
+    assert cues(parse_subtitle_string(vtt)) == [(1000, 2000, "first"), (3000, 4000, "second")]
+
+
+def test_srt_without_blank_line_between_cues():
+    srt = "1\n00:00:01,000 --> 00:00:02,000\nfirst\n2\n00:00:03,000 --> 00:00:04,000\nsecond\n"
+    assert cues(parse_subtitle_string(srt)) == [(1000, 2000, "first"), (3000, 4000, "second")]
+
+
+def test_crlf():
+    assert cues(parse_subtitle_string(SRT.replace("\n", "\r\n"))) == cues(parse_subtitle_string(SRT))
+
+
+def test_youtube_detected():
+    vtt = ("WEBVTT\n\n00:00:00.000 --> 00:00:01.000\n \nhello<00:00:00.500><c> world</c>\n\n"
+           "00:00:01.000 --> 00:00:01.010\nhello world\n \n")
+    track = parse_subtitle_string(vtt)
+    assert track.caption_type == CaptionType.YOUTUBE_AUTO_GENERATED
+    assert track.text(0).strip() == "hello world"
+    assert '<c>' in track.raw_text(0)
+
+
+def test_stream_parser_any_chunking():
+    content = SRT.replace("\n", "\r\n")
+    expected = cues(parse_subtitle_string(SRT))
+    for size in (1, 2, 3, 7, 64):
+        parser = SubtitleStreamParser()
+        for i in range(0, len(content), size):
+            parser.feed(content[i:i + size])
+        track = parser.close()
+        assert track.complete
+        assert cues(track) == expected, size
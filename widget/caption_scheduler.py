@@ -0,0 +1,76 @@
+import time
+
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+
+class CaptionScheduler(QObject):
+    """
+    Drives caption updates from the caption index instead of polling on every VLC tick.
+
+    The media clock is anchored on mediaplayer.get_time() and extrapolated with
+    time.monotonic(); after every update one precise single-shot QTimer is armed for the
+    next caption boundary.  resync() re-anchors the clock and must be called (or
+    resyncRequested emitted, from any thread) after seek, pause, play or rate change.
+    """
+    resyncRequested = pyqtSignal()
+
+    # re-check at least this often, so missed seeks and clock drift heal by themselves
+    MAX_WAIT = 1000
+    # a track that is still being extracted gets new captions all the time
+    MAX_WAIT_GROWING = 250
+    # player time further than this from the extrapolated clock means someone seeked
+    MAX_DRIFT = 300
+
+    def __init__(self, mediaplayer, get_index, on_boundary, parent=None):
+        """
+        :param mediaplayer: vlc.MediaPlayer to take the clock from
+        :param get_index: returns the current CaptionIndex
+        :param on_boundary: called with the media time (ms) whenever captions may change
+        """
+        super().__init__(parent)
+        self.mediaplayer = mediaplayer
+        self.get_index = get_index
+        self.on_boundary = on_boundary
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.update)
+        self.resyncRequested.connect(self.resync)
+
+        self._anchor_time = 0
+        self._anchor_clock = time.monotonic()
+        self._rate = 1.0
+        self._playing = False
+
+    def now(self):
+        """Extrapolated media time in milliseconds"""
+        if not self._playing:
+            return self._anchor_time
+        return self._anchor_time + int((time.monotonic() - self._anchor_clock) * 1000 * self._rate)
+
+    def resync(self):
+        """Re-anchor the clock on the player"""
+        self._anchor_time = max(0, self.mediaplayer.get_time())
+        self._anchor_clock = time.monotonic()
+        self._rate = self.mediaplayer.get_rate() or 1.0
+        self._playing = bool(self.mediaplayer.is_playing())
+        self.update()
+
+    def check_drift(self, player_time):
+        """Cheap check for the VLC time callback (any thread), re-syncs only on a jump"""
+        if abs(player_time - self.now()) > self.MAX_DRIFT:
+            self.resyncRequested.emit()
+
+    def update(self):
+        t = self.now()
+        self.on_boundary(t)
+        self.timer.stop()
+        if not self._playing:
+            return
+        index = self.get_index()
+        wait = self.MAX_WAIT if getattr(index.captions, 'complete', True) else self.MAX_WAIT_GROWING
+        boundary = index.next_boundary(t)
+        if boundary is not None:
+            # +1ms so the timer never fires just before the boundary
+            wait = min(wait, (boundary - t) / self._rate + 1)
+        self.timer.start(max(1, int(wait)))
@@ -0,0 +1,49 @@
+from PyQt5.QtCore import pyqtSignal, Qt
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLineEdit, QListWidget, QListWidgetItem
+
+from caption.track import format_timestamp
+
+
+class CaptionSearchDialog(QDialog):
+    """字幕搜索: type a word or phrase, double click / enter on a result to jump there"""
+    seekRequested = pyqtSignal(int)  # caption start in milliseconds
+
+    def __init__(self, get_search_index, parent=None):
+        """
+        :param get_search_index: returns the CaptionSearchIndex of the current track
+        """
+        super().__init__(parent)
+        self.setWindowTitle("搜索字幕")
+        self.get_search_index = get_search_index
+        layout = QVBoxLayout()
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("输入单词或句子...")
+        self.result_list = QListWidget()
+        layout.addWidget(self.query_edit)
+        layout.addWidget(self.result_list)
+        self.setLayout(layout)
+
+        self.query_edit.textChanged.connect(self.search)
+        self.query_edit.returnPressed.connect(self.seek_to_first)
+        self.result_list.itemActivated.connect(self.seek_to_item)
+        self.resize(560, 420)
+
+    def search(self, query):
+        self.result_list.clear()
+        index = self.get_search_index()
+        if index is None:
+            return
+        captions = index.captions
+        for seq in index.search(query):
+            caption = captions[seq]['caption']
+            text = caption.text.replace('\n', ' ')
+            item = QListWidgetItem(f"{format_timestamp(caption.start_in_milliseconds)[:8]}  {text}")
+            item.setData(Qt.UserRole, caption.start_in_milliseconds)
+            self.result_list.addItem(item)
+
+    def seek_to_first(self):
+        if self.result_list.count() > 0:
+            self.seek_to_item(self.result_list.item(0))
+
+    def seek_to_item(self, item):
+        self.seekRequested.emit(item.data(Qt.UserRole))
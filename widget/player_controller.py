@@ -50,8 +50,8 @@ def handle_selection_changed(window, thread_pool):
         if not selected_text:
             return
 
-        def lookup_caption_task(text):
-            return window.translator.query(text)
+        def lookup_caption_task(text, lemma):
+            return window.translator.query(text, lemma)
 
         def on_result(result):
             # emit again
@@ -68,6 +68,17 @@ def handle_selection_changed(window, thread_pool):
             lookup_type = LookUpType.SENTENCE
         if lookup_type == LookUpType.WORD:
             window.pause("lookup")
+            prefetcher = getattr(window, 'dict_prefetcher', None)
+            html = prefetcher.get(selected_text) if prefetcher is not None else None
+            if html is not None:
+                # looked up ahead of playback, no database or rendering work left
+                window.floatingWindow.captionReady.emit({
+                    'text': html,
+                    'pos': pos,
+                    "state": LookupState.LOADED,
+                    "lookup_type": lookup_type,
+                })
+                return
             window.floatingWindow.captionReady.emit({
                 'text': "loading...",
                 'pos': pos,
@@ -75,8 +86,15 @@ def handle_selection_changed(window, thread_pool):
                 "lookup_type": lookup_type,
             })
 
-            thread_pool.start(Worker(lookup_caption_task, selected_text, on_finished=on_result))
+            word = selected_text.strip()
+            tokens = getattr(window, 'caption_tokens', None)
+            lemma = tokens.lemma_of(word) if tokens is not None else None
+            thread_pool.start(Worker(lookup_caption_task, word, lemma, on_finished=on_result))
         elif lookup_type == LookUpType.SENTENCE:
+            # a cue is often only part of a sentence, translate the whole sentence in one request
+            sentences = getattr(window, 'caption_sentences', None)
+            if sentences is not None:
+                selected_text = sentences.expand(selected_text, window.cur_caption_seq)
             print("sentence lookup", len(selected_text.split()), "words")
             window.pause("lookup")
             window.floatingWindow.captionReady.emit({
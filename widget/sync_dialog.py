@@ -0,0 +1,47 @@
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtWidgets import QDialog, QFormLayout, QSpinBox, QDoubleSpinBox, QPushButton
+
+
+class CaptionSyncDialog(QDialog):
+    """字幕同步: constant offset plus a linear drift, applied live while playing"""
+    syncChanged = pyqtSignal(int, float)  # offset ms, drift (fraction of the media time)
+
+    def __init__(self, offset=0, drift=0.0, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("字幕同步")
+        layout = QFormLayout()
+
+        self.offset_box = QSpinBox()
+        self.offset_box.setRange(-600000, 600000)
+        self.offset_box.setSingleStep(100)
+        self.offset_box.setSuffix(" ms")
+        # drift is edited as how far the captions slip per minute of video
+        self.drift_box = QDoubleSpinBox()
+        self.drift_box.setRange(-5000, 5000)
+        self.drift_box.setDecimals(1)
+        self.drift_box.setSingleStep(10)
+        self.drift_box.setSuffix(" ms/min")
+        self.set_values(offset, drift)
+        reset_button = QPushButton("Reset")
+
+        layout.addRow("延迟 (正数字幕推后)", self.offset_box)
+        layout.addRow("漂移", self.drift_box)
+        layout.addRow(reset_button)
+        self.setLayout(layout)
+
+        self.offset_box.valueChanged.connect(self.emit_sync)
+        self.drift_box.valueChanged.connect(self.emit_sync)
+        reset_button.clicked.connect(lambda: self.set_values(0, 0.0, emit=True))
+
+    def set_values(self, offset, drift, emit=False):
+        self.offset_box.blockSignals(True)
+        self.drift_box.blockSignals(True)
+        self.offset_box.setValue(int(offset))
+        self.drift_box.setValue(drift * 60000)
+        self.offset_box.blockSignals(False)
+        self.drift_box.blockSignals(False)
+        if emit:
+            self.emit_sync()
+
+    def emit_sync(self):
+        self.syncChanged.emit(self.offset_box.value(), self.drift_box.value() / 60000)